@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
 import sys
 import time
 from pathlib import Path
@@ -11,7 +12,8 @@ from src.encoders import get_encoder
 from src.core.compressor import Compressor
 from src.core.scheduler import SmartScheduler
 from src.utils.file_ops import find_videos
-from src.analysis.vmaf import VMAFAnalyzer
+from src.analysis.vmaf import VMAF_BATCH_SIZE, VMAFAnalyzer
+from src.analysis.vmaf_cache import VMAFScoreCache
 from src.analysis.plotting import EfficiencyPlotter
 from src.utils.console import error, info, section, success, warn
 from src.utils.naming import build_output_filename
@@ -37,6 +39,17 @@ def _resolve_output_for_file(input_file: Path, output_path: Path) -> Path:
     return output_path
 
 
+def _run_compress_jobs(compressor: Compressor, jobs: list[tuple[Path, Path, dict]], concurrency: int) -> None:
+    """执行压缩任务列表；concurrency > 1 时通过 asyncio 并发运行多个 ffmpeg。"""
+
+    if concurrency > 1 and len(jobs) > 1:
+        asyncio.run(compressor.compress_files_async(jobs, max_concurrency=concurrency))
+        return
+
+    for inp, out, options in jobs:
+        compressor.compress_file(inp, out, **options)
+
+
 def cmd_compress(args):
     """处理递归或单文件压缩。"""
     section("压缩")
@@ -48,9 +61,13 @@ def cmd_compress(args):
         return
 
     encoder = get_encoder(args.encoder)
-    compressor = Compressor(encoder)
+    compressor = Compressor(encoder, hardlink_fallback=args.hardlink_fallback)
 
-    max_ratio = DEFAULT_SIZE_LIMIT
+    options: dict = {"max_ratio": DEFAULT_SIZE_LIMIT}
+    if args.quality is not None:
+        options["quality"] = args.quality
+
+    jobs: list[tuple[Path, Path, dict]] = []
 
     if input_path.is_dir():
         videos = find_videos(input_path, extensions=COMPRESS_INPUT_EXTS, recursive=True)
@@ -63,16 +80,12 @@ def cmd_compress(args):
             if _should_skip(out_file, args.force):
                 continue
 
-            if args.quality is not None:
-                compressor.compress_file(vid, out_file, max_ratio=max_ratio, quality=args.quality)
-            else:
-                compressor.compress_file(vid, out_file, max_ratio=max_ratio)
+            jobs.append((vid, out_file, options))
     else:
         out_file = _resolve_output_for_file(input_path, output_path)
-        if args.quality is not None:
-            compressor.compress_file(input_path, out_file, max_ratio=max_ratio, quality=args.quality)
-        else:
-            compressor.compress_file(input_path, out_file, max_ratio=max_ratio)
+        jobs.append((input_path, out_file, options))
+
+    _run_compress_jobs(compressor, jobs, args.jobs)
 
 
 def cmd_batch(args):
@@ -90,13 +103,15 @@ def cmd_batch(args):
     end = args.range_end
     
     info(f"批量请求: {encoder.name} | 参数范围: {start}-{end}")
+
+    jobs: list[tuple[Path, Path, dict]] = []
     
     for vid in videos:
         info(f"扫描: {vid.name}", leading_blank=True)
         
         for q in range(start, end + 1):
-            # macOS 编码器存在“重复输出”的已知参数点，保持原有跳过策略
-            if encoder.name == "mac" and not encoder.is_valid_quality(q):
+            # 部分编码器（目前为 macOS）存在“重复输出”的已知参数点，保持原有跳过策略
+            if encoder.HAS_QUALITY_FILTER and not encoder.is_valid_quality(q):
                 warn(f"跳过参数 {q} (已知 {encoder.name} 在此参数下产生重复结果)")
                 continue
 
@@ -106,7 +121,9 @@ def cmd_batch(args):
             if _should_skip(out_file, args.force):
                 continue
             
-            compressor.compress_file(vid, out_file, quality=q)
+            jobs.append((vid, out_file, {"quality": q}))
+
+    _run_compress_jobs(compressor, jobs, args.jobs)
 
 def cmd_analyze(args):
     section("VMAF 分析")
@@ -134,7 +151,8 @@ def cmd_analyze(args):
         comp_files=all_comp_videos,
         output_csv=output_csv,
         jobs=args.jobs,
-        use_neg_model=args.use_neg_model
+        use_neg_model=args.use_neg_model,
+        batch_size=args.batch_size,
     )
 
 def cmd_smart(args):
@@ -148,8 +166,9 @@ def cmd_smart(args):
         return
 
     encoder = get_encoder(args.encoder)
-    compressor = Compressor(encoder)
-    vmaf = VMAFAnalyzer()
+    compressor = Compressor(encoder, hardlink_fallback=args.hardlink_fallback)
+    vmaf = VMAFAnalyzer(probe_subsample=args.vmaf_subsample)
+    vmaf_cache = None if args.no_vmaf_cache else VMAFScoreCache()
     
     scheduler = SmartScheduler(
         compressor=compressor,
@@ -159,6 +178,15 @@ def cmd_smart(args):
         max_analyze_workers=args.analyze_workers,
         max_pending_analyses=args.max_pending_analyses,
         queue_debug=args.queue_debug,
+        speculative_probes=not args.no_speculate,
+        reference_cache=args.vmaf_ref_cache,
+        max_compress_workers=args.compress_workers,
+        fused_scoring=args.fused_vmaf,
+        cpu_partition=not args.no_cpu_partition,
+        vmaf_shortcut=not args.no_vmaf_shortcut,
+        vmaf_cache=vmaf_cache,
+        max_attempts=args.max_attempts,
+        size_presample=args.size_presample,
     )
     
     tasks: list[tuple[Path, Path, str]] = []
@@ -191,10 +219,14 @@ def cmd_smart(args):
         tasks.append((input_path, out_file, input_path.name))
 
     # 启动调度器
-    if tasks:
-        scheduler.start(tasks)
-    else:
-        warn("没有需要处理的任务。")
+    try:
+        if tasks:
+            scheduler.start(tasks)
+        else:
+            warn("没有需要处理的任务。")
+    finally:
+        if vmaf_cache is not None:
+            vmaf_cache.close()
 
 def cmd_plot(args):
     plotter = EfficiencyPlotter(
@@ -213,6 +245,12 @@ def main():
     p_compress.add_argument("output", help="输出文件或目录")
     p_compress.add_argument("--encoder", choices=["intel", "nvidia", "mac"], required=True, help="编码器")
     p_compress.add_argument("--quality", type=int, help="质量参数（QP、global_quality 等）")
+    p_compress.add_argument("--jobs", type=int, default=1, help="并行压缩任务数（默认: 1）")
+    p_compress.add_argument(
+        "--hardlink-fallback",
+        action="store_true",
+        help="回退原视频时在同一文件系统内使用硬链接代替复制（输出与原视频共享数据）",
+    )
     p_compress.add_argument("--force", action="store_true", help="覆盖已存在文件")
     p_compress.set_defaults(func=cmd_compress)
 
@@ -223,6 +261,7 @@ def main():
     p_batch.add_argument("--encoder", choices=["intel", "nvidia", "mac"], required=True)
     p_batch.add_argument("--start", dest="range_start", type=int, required=True, help="参数范围起点")
     p_batch.add_argument("--end", dest="range_end", type=int, required=True, help="参数范围终点")
+    p_batch.add_argument("--jobs", type=int, default=1, help="并行压缩任务数（默认: 1）")
     p_batch.add_argument("--force", action="store_true", help="覆盖已存在文件")
     p_batch.set_defaults(func=cmd_batch)
 
@@ -233,8 +272,19 @@ def main():
     p_analyze.add_argument("--output", default="Results/FFMetrics.Results.csv", help="输出 CSV 文件")
     p_analyze.add_argument("--ffmpeg", default="ffmpeg", help="ffmpeg 可执行文件")
     p_analyze.add_argument("--ffprobe", default="ffprobe", help="ffprobe 可执行文件")
-    p_analyze.add_argument("--jobs", type=int, default=1, help="并行任务数")
+    p_analyze.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="同时运行的 ffmpeg 进程数（每个进程合并计算最多 --batch-size 个文件，组内平分 libvmaf 线程）",
+    )
     p_analyze.add_argument("--use-neg-model", action="store_true", help="使用 VMAF NEG 模型")
+    p_analyze.add_argument(
+        "--batch-size",
+        type=int,
+        default=VMAF_BATCH_SIZE,
+        help=f"单个 ffmpeg 进程合并计算的文件数（默认: {VMAF_BATCH_SIZE}，1 表示逐个计算）",
+    )
     p_analyze.set_defaults(func=cmd_analyze)
 
     # 智能压缩命令
@@ -245,6 +295,12 @@ def main():
     p_smart.add_argument("--vmaf-target", type=float, default=95.0, help="目标 VMAF 分数（默认: 95）")
     p_smart.add_argument("--size-limit", type=float, default=0.8, help="最大体积比例（默认: 0.8）")
     p_smart.add_argument("--analyze-workers", type=int, default=2, help="VMAF 分析线程数（默认: 2）")
+    p_smart.add_argument(
+        "--compress-workers",
+        type=int,
+        default=None,
+        help="并行压缩线程数（默认自动：intel/nvidia 为 2，mac 为 1）",
+    )
     p_smart.add_argument(
         "--max-pending-analyses",
         type=int,
@@ -252,6 +308,56 @@ def main():
         help="分析队列积压阈值（默认: 自动=分析线程数，最小 1）",
     )
     p_smart.add_argument("--queue-debug", action="store_true", help="打印队列入队/出队调试日志")
+    p_smart.add_argument("--no-speculate", action="store_true", help="禁用压缩线程空闲时的预压缩")
+    p_smart.add_argument(
+        "--vmaf-ref-cache",
+        action="store_true",
+        help="将原视频转为 FFV1 无损缓存，同一视频的多次 VMAF 探测复用（省去重复解码，占用额外磁盘）",
+    )
+    p_smart.add_argument(
+        "--vmaf-subsample",
+        type=int,
+        default=1,
+        help="搜索阶段 VMAF 每 N 帧计算一帧（默认: 1 逐帧；如 5 可显著加速，最终结果会逐帧复核）",
+    )
+    p_smart.add_argument(
+        "--fused-vmaf",
+        action="store_true",
+        help="边压缩边计算 VMAF（编码输出经管道直接送入 VMAF，跳过独立分析阶段）",
+    )
+    p_smart.add_argument(
+        "--no-vmaf-cache",
+        action="store_true",
+        help="不读写 VMAF 分数缓存（默认缓存于 ~/.cache/vct/vmaf.json，重复运行时跳过相同结果的分析）",
+    )
+    p_smart.add_argument(
+        "--no-vmaf-shortcut",
+        action="store_true",
+        help="禁用安全参数捷径：质量不差于编码器已知安全参数时也实际计算 VMAF（严格质量流程）",
+    )
+    p_smart.add_argument(
+        "--max-attempts",
+        type=int,
+        default=None,
+        help="每个视频最多压缩探测次数（默认不限，直到找到刚好达标的参数；如 3 可换取更少的编码次数）",
+    )
+    p_smart.add_argument(
+        "--size-presample",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="完整压缩前先编码开头 N 秒外推体积，明显超过 --size-limit 时跳过该参数（默认关闭）",
+    )
+    p_smart.add_argument(
+        "--no-cpu-partition",
+        action="store_true",
+        help="Linux 下不对分析线程降优先级与绑核",
+    )
+    p_smart.add_argument(
+        "--hardlink-fallback",
+        action="store_true",
+        help="回退原视频时在同一文件系统内使用硬链接代替复制（输出与原视频共享数据）",
+    )
     p_smart.add_argument("--force", action="store_true", help="覆盖已存在文件")
     p_smart.set_defaults(func=cmd_smart)
 
@@ -263,6 +369,8 @@ def main():
     p_plot.set_defaults(func=cmd_plot)
 
     args = parser.parse_args()
+    if getattr(args, "max_attempts", None) is not None and args.max_attempts < 1:
+        parser.error("--max-attempts 必须大于等于 1")
     if hasattr(args, "func"):
         command_name = args.command or "unknown"
         info(f"命令开始: {command_name}", leading_blank=True)
@@ -7,6 +7,31 @@ from typing import List, Optional
 
 from src.utils.console import error, info, success, warn
 
+# 文件名约定的参数后缀（含历史遗留写法）：后缀标记 -> (设备, 模式)
+_SUFFIX_TAGS = {
+    "intel_q": ("Intel", "qsv"),
+    "qsv_": ("Intel", "qsv"),
+    "nvidia_qmax": ("Nvidia", "qmax"),
+    "max_": ("Nvidia", "qmax"),
+    "nvidia_qp": ("Nvidia", "constqp"),
+    "mac_qv": ("MAC", "videotoolbox"),
+    "mac_": ("MAC", "videotoolbox"),
+}
+# 各后缀合并为一个预编译正则，一次匹配即可得到来源、后缀标记与参数
+_SUFFIX_RE = re.compile(
+    r"^(?P<source>.+)_(?P<tag>" + "|".join(re.escape(tag) for tag in _SUFFIX_TAGS) + r")(?P<param>\d+)$"
+)
+
+# 设备显示名 -> 固定颜色（extract_info 只会产生这些名称）
+_DEVICE_COLORS = {
+    "Intel": "tab:blue",
+    "Nvidia": "tab:green",
+    "Nvidia (qmax)": "tab:green",
+    "Nvidia (QP)": "tab:green",
+    "Nvidia (QP+AQ)": "tab:green",
+    "MAC": "tab:orange",
+}
+
 class EfficiencyPlotter:
     def __init__(self, csv_path: Path, output_dir: Path):
         self.csv_path = csv_path
@@ -40,32 +65,18 @@ class EfficiencyPlotter:
         aq = False
         if stem.endswith("_aq"):
             aq = True
-            stem = re.sub(r"_aq$", "", stem)
+            stem = stem[:-len("_aq")]
 
         device = "未知"
         param_value = 0
         source = stem
         mode = "未知"
 
-        # 匹配文件名约定的正则模式
-        patterns = [
-            ("Intel", "qsv", r"^(?P<source>.+)_intel_q(?P<param>\d+)$"),
-            ("Intel", "qsv", r"^(?P<source>.+)_qsv_(?P<param>\d+)$"),
-            ("Nvidia", "qmax", r"^(?P<source>.+)_nvidia_qmax(?P<param>\d+)$"),
-            ("Nvidia", "qmax", r"^(?P<source>.+)_max_(?P<param>\d+)$"),
-            ("Nvidia", "constqp", r"^(?P<source>.+)_nvidia_qp(?P<param>\d+)$"),
-            ("MAC", "videotoolbox", r"^(?P<source>.+)_mac_qv(?P<param>\d+)$"),
-            ("MAC", "videotoolbox", r"^(?P<source>.+)_mac_(?P<param>\d+)$"),
-        ]
-
-        for dev, m, pat in patterns:
-            match = re.match(pat, stem)
-            if match:
-                device = dev
-                mode = m
-                param_value = int(match.group("param"))
-                source = match.group("source")
-                break
+        match = _SUFFIX_RE.match(stem)
+        if match:
+            device, mode = _SUFFIX_TAGS[match.group("tag")]
+            param_value = int(match.group("param"))
+            source = match.group("source")
         
         # 优化设备显示名称
         if device == "Nvidia":
@@ -91,22 +102,19 @@ class EfficiencyPlotter:
             error(f"读取 CSV 失败: {e}")
             return
 
-        # 扩充数据
-        data_rows = []
-        for _, row in df.iterrows():
-            fspec = row["FileSpec"]
+        # 扩充数据：按列直接迭代（不用 iterrows 逐行构造 Series），结果按列收集后一次构建 DataFrame
+        columns: dict = {"Device": [], "Param": [], "Source": [], "VMAF": [], "Bitrate": [], "AQ": []}
+        for fspec, vmaf, bitrate in zip(df["FileSpec"], df["VMAF-Value"], df["Bitrate"]):
             device, param, source, aq = self.extract_info(fspec)
             if device != "未知":
-                data_rows.append({
-                    "Device": device,
-                    "Param": param,
-                    "Source": source,
-                    "VMAF": row["VMAF-Value"],
-                    "Bitrate": row["Bitrate"],
-                    "AQ": aq
-                })
+                columns["Device"].append(device)
+                columns["Param"].append(param)
+                columns["Source"].append(source)
+                columns["VMAF"].append(vmaf)
+                columns["Bitrate"].append(bitrate)
+                columns["AQ"].append(aq)
         
-        clean_df = pd.DataFrame(data_rows)
+        clean_df = pd.DataFrame(columns)
         if clean_df.empty:
             warn("未解析到有效数据。")
             return
@@ -129,14 +137,7 @@ class EfficiencyPlotter:
 
     def _get_color(self, device_name: str) -> Optional[str]:
         """返回对应设备的固定颜色"""
-        dev_lower = device_name.lower()
-        if "nvidia" in dev_lower:
-            return "tab:green"
-        elif "intel" in dev_lower:
-            return "tab:blue"
-        elif "mac" in dev_lower:
-            return "tab:orange"
-        return None
+        return _DEVICE_COLORS.get(device_name)
 
     def _plot_single_source(self, source: str, df: pd.DataFrame):
         plt.figure(figsize=(10, 6))
@@ -150,11 +151,11 @@ class EfficiencyPlotter:
             plt.plot(d["Bitrate"], d["VMAF"], marker='o', label=dev, color=color)
             
             # 标注质量参数
-            for _, row in d.iterrows():
+            for bitrate, vmaf, param in zip(d["Bitrate"], d["VMAF"], d["Param"]):
                 plt.text(
-                    row["Bitrate"], 
-                    row["VMAF"], 
-                    str(row["Param"]), 
+                    bitrate, 
+                    vmaf, 
+                    str(param), 
                     fontsize=9, 
                     color=color,
                     weight='bold',
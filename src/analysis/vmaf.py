@@ -1,20 +1,61 @@
+import asyncio
 import subprocess
 import csv
+import json
+import os
 import re
+import tempfile
 from pathlib import Path
-from typing import List, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import IO, List, Optional, Tuple
 from functools import lru_cache
 
 from src.utils.console import error, info, phase_start, progress, success, warn
 from src.utils.naming import strip_param_suffix
+from src.utils.process import (
+    NEW_GROUP_KWARGS,
+    register_async_process,
+    register_process,
+    unregister_async_process,
+    unregister_process,
+)
+
+# 单个 ffmpeg 进程内合并计算的 (参考, 压缩) 对数量上限，避免同时解码过多视频占满内存
+VMAF_BATCH_SIZE = 8
+# 未指定时每个 libvmaf 实例使用的线程数
+DEFAULT_VMAF_THREADS = 4
+
+# 直接匹配 stderr 原始字节，免去逐行解码
+_VMAF_SCORE_RE = re.compile(rb"VMAF score[:=]\s*([0-9.]+)")
+# 参考视频扩展名及优先级（同名时靠前者优先）
+_REF_EXT_PRIORITY = {ext: rank for rank, ext in enumerate((".mp4", ".mkv", ".mov", ".avi"))}
+# 异步读取 VMAF 进程 stderr 的块大小与保留的末尾字节数（pooled 分数行在结尾）
+_STDERR_READ_BYTES = 65536
+_STDERR_TAIL_BYTES = 8192
+
 
 class VMAFAnalyzer:
-    def __init__(self, ffmpeg_bin: str = "ffmpeg", ffprobe_bin: str = "ffprobe"):
+    def __init__(
+        self,
+        ffmpeg_bin: str = "ffmpeg",
+        ffprobe_bin: str = "ffprobe",
+        probe_subsample: int = 1,
+        final_subsample: int = 1,
+        n_threads: Optional[int] = None,
+    ):
         self.ffmpeg_bin = ffmpeg_bin
         self.ffprobe_bin = ffprobe_bin
+        # libvmaf n_subsample：每 N 帧计算一帧。搜索探测只需判断是否达标，可用较大的 N；
+        # 最终结果用 final_subsample 复核
+        self.probe_subsample = max(1, probe_subsample)
+        self.final_subsample = max(1, final_subsample)
+        # libvmaf n_threads；None 表示由调用方（如调度器按分析线程数）决定，未决定时用 DEFAULT_VMAF_THREADS
+        self.n_threads = n_threads
         self._check_vmaf_support()
 
+    @property
+    def threads(self) -> int:
+        return self.n_threads or DEFAULT_VMAF_THREADS
+
     @lru_cache(maxsize=1024)
     def _get_resolution_cached(self, file_path_str: str) -> Optional[tuple[int, int]]:
         """使用 ffprobe 获取视频分辨率（宽, 高），带缓存以减少重复探测。"""
@@ -123,123 +164,426 @@ class VMAFAnalyzer:
         except Exception as e:
             warn(f"无法验证 VMAF 支持: {e}")
 
+    def _bitrate_cmd(self, file_path: Path) -> List[str]:
+        # 一次调用同时查询容器与视频流的 bit_rate
+        return [
+            self.ffprobe_bin,
+            "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "format=bit_rate:stream=bit_rate",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            str(file_path),
+        ]
+
+    @staticmethod
+    def _parse_bitrate(output: str) -> Optional[float]:
+        # 默认输出格式中流信息在前、容器信息在后：倒序取第一个数值
+        for line in reversed(output.split()):
+            try:
+                return float(line) / 1000.0  # bit 转 kbps
+            except ValueError:
+                continue
+        return None
+
     def get_bitrate(self, file_path: Path) -> Optional[float]:
-        """使用 ffprobe 获取视频比特率（kbps）。"""
+        """使用 ffprobe 获取比特率（kbps）。
+
+        优先容器总码率（与 FFMetrics 一致），容器未记录（N/A）时回退视频流码率，不再为回退额外启动 ffprobe。
+        """
+        try:
+            output = subprocess.check_output(self._bitrate_cmd(file_path)).decode()
+        except Exception:
+            return None
+        return self._parse_bitrate(output)
+
+    async def _aget_bitrate(self, file_path: Path) -> Optional[float]:
+        """`get_bitrate` 的异步版本。"""
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *self._bitrate_cmd(file_path),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            stdout, _ = await proc.communicate()
+        except OSError:
+            return None
+        if proc.returncode != 0:
+            return None
+        return self._parse_bitrate(stdout.decode())
+
+    def get_duration(self, file_path: Path) -> Optional[float]:
+        """使用 ffprobe 获取容器时长（秒）。"""
         try:
             cmd = [
                 self.ffprobe_bin,
                 "-v", "error",
-                "-select_streams", "v:0",
-                "-show_entries", "format=bit_rate",
+                "-show_entries", "format=duration",
                 "-of", "default=noprint_wrappers=1:nokey=1",
                 str(file_path),
             ]
             output = subprocess.check_output(cmd).decode().strip()
             if not output or output == "N/A":
                 return None
-            return float(output) / 1000.0  # bit 转 kbps
+            return float(output)
         except Exception:
             return None
 
+    def build_reference_cache(self, ref_file: Path, cache_file: Path) -> bool:
+        """将参考视频的视频流转码为 FFV1 无损缓存，供同一视频的多次 VMAF 探测复用。
+
+        FFV1 解码远快于 H.264/H.265 长 GOP 源（尤其 4K），且逐帧无损，分数与直接使用原视频一致。
+        """
+
+        cmd = [
+            self.ffmpeg_bin,
+            "-v", "error",
+            "-y",
+            "-i", str(ref_file),
+            "-map", "0:v:0",
+            "-an",
+            "-c:v", "ffv1",
+            str(cache_file),
+        ]
+        try:
+            result = subprocess.run(
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                encoding="utf-8",
+                errors="ignore",
+                check=False,
+            )
+        except Exception as e:
+            warn(f"生成参考缓存失败: {ref_file.name} | {e}")
+            return False
+
+        if result.returncode != 0:
+            warn(f"生成参考缓存失败: {ref_file.name} | {result.stderr.strip()}")
+            cache_file.unlink(missing_ok=True)
+            return False
+        return True
+
     def calculate_vmaf(
         self, 
         ref_file: Path, 
         main_file: Path, 
-        use_neg_model: bool = False
+        use_neg_model: bool = False,
+        model_str: Optional[str] = None,
+        reference_cache: Optional[Path] = None,
+        n_subsample: int = 1,
     ) -> Optional[float]:
-        """计算 VMAF 分数。"""
+        """计算 VMAF 分数。
+
+        :param model_str: 调用方已解析好的模型字符串；传入时跳过重复的模型选择。
+        :param reference_cache: `build_reference_cache` 生成的无损参考缓存；传入时替代 ref_file 作为参考输入，
+            模型选择仍以 ref_file 为准。
+        :param n_subsample: 每 N 帧计算一帧（1 表示逐帧）。
+        """
 
         # 根据分辨率自动选择模型：低于 4K 用默认模型，等于或高于 4K 用 4K 模型
         # 优先以参考视频分辨率为准；探测失败则回退默认模型
-        model_str = self._build_vmaf_model_str(ref_file, use_neg_model)
-        
+        model_str = model_str or self._build_vmaf_model_str(ref_file, use_neg_model)
+        return self._run_vmaf(
+            reference_cache or ref_file,
+            ["-i", str(main_file)],
+            model_str,
+            label=main_file.name,
+            n_subsample=n_subsample,
+        )
+
+    def calculate_vmaf_stream(
+        self,
+        ref_file: Path,
+        stream: IO[bytes],
+        stream_format: str,
+        model_str: Optional[str] = None,
+        reference_cache: Optional[Path] = None,
+        n_subsample: int = 1,
+    ) -> Optional[float]:
+        """以管道中的压缩视频流作为 distorted 输入计算 VMAF（边压缩边评估）。
+
+        :param stream: 可读的压缩视频字节流（通常是编码进程的 stdout），作为 ffmpeg 的 stdin。
+        :param stream_format: 流的封装格式（管道不可 seek，需显式指定，例如 mpegts）。
+        """
+
+        model_str = model_str or self._build_vmaf_model_str(ref_file, False)
+        return self._run_vmaf(
+            reference_cache or ref_file,
+            ["-f", stream_format, "-i", "pipe:0"],
+            model_str,
+            label=ref_file.name,
+            stdin=stream,
+            n_subsample=n_subsample,
+        )
+
+    def _vmaf_cmd(
+        self, ref_input: Path, main_input_args: List[str], model_str: str, n_subsample: int = 1
+    ) -> List[str]:
         # libvmaf 期望输入顺序为 [distorted][reference]
-        # 这里 distorted=压缩视频(main_file)，reference=原视频(ref_file)
-        filter_complex = f"[1:v][0:v]libvmaf=model={model_str}:n_threads=4"
+        # 这里 distorted=压缩视频(第 2 个输入)，reference=原视频(第 1 个输入)
+        filter_complex = f"[1:v][0:v]libvmaf=model={model_str}:n_threads={self.threads}"
+        if n_subsample > 1:
+            filter_complex += f":n_subsample={n_subsample}"
 
-        cmd = [
+        return [
             self.ffmpeg_bin,
-            "-i", str(ref_file),
-            "-i", str(main_file),
+            # 不输出进度统计：分数只从结尾的 pooled 结果解析，进度行只会撑大 stderr
+            "-nostats",
+            "-i", str(ref_input),
+            *main_input_args,
             "-filter_complex", filter_complex,
             "-f", "null",
             "-"
         ]
 
+    async def _acalculate_vmaf(self, ref_file: Path, main_file: Path, model_str: str) -> Optional[float]:
+        """`calculate_vmaf` 的异步版本（逐帧、模型由调用方给出），供批量分析回退使用。"""
+
+        cmd = self._vmaf_cmd(ref_file, ["-i", str(main_file)], model_str)
         try:
-            result = subprocess.run(
-                cmd, 
-                stdout=subprocess.PIPE, 
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+                **NEW_GROUP_KWARGS,
+            )
+        except OSError as e:
+            warn(f"计算 VMAF 失败: {main_file.name} | {e}")
+            return None
+        # 子进程在独立会话中，收不到 Ctrl+C：登记后由退出钩子兜底整组终止
+        handle = register_async_process(proc)
+
+        # 不按行读取（单行长度不受控）；pooled 分数在结尾输出，只保留末尾部分再解析
+        tail = b""
+        try:
+            while True:
+                chunk = await proc.stderr.read(_STDERR_READ_BYTES)
+                if not chunk:
+                    break
+                tail = (tail + chunk)[-_STDERR_TAIL_BYTES:]
+            await proc.wait()
+        except asyncio.CancelledError:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            raise
+        finally:
+            await unregister_async_process(handle)
+        matches = _VMAF_SCORE_RE.findall(tail)
+        return float(matches[-1]) if matches else None
+
+    def _run_vmaf(
+        self,
+        ref_input: Path,
+        main_input_args: List[str],
+        model_str: str,
+        label: str,
+        stdin: Optional[IO[bytes]] = None,
+        n_subsample: int = 1,
+    ) -> Optional[float]:
+        """执行单组 VMAF 计算并解析 pooled 分数。"""
+
+        cmd = self._vmaf_cmd(ref_input, main_input_args, model_str, n_subsample)
+        try:
+            proc = subprocess.Popen(
+                cmd,
+                stdin=stdin,
+                stdout=subprocess.DEVNULL,
                 stderr=subprocess.PIPE,
-                encoding="utf-8",
-                errors="ignore"
+                **NEW_GROUP_KWARGS,
             )
-            
-            # 解析 VMAF 分数输出
-            lines = result.stderr.splitlines()
-            for line in reversed(lines):
-                if "VMAF score" in line:
-                    match = re.search(r"VMAF score[:=]\s*([0-9.]+)", line)
+            register_process(proc)
+            try:
+                # 逐行扫描 stderr 原始字节：pooled 分数只在结尾输出一次，匹配到即停止解析，
+                # 剩余输出直接读空丢弃，避免进程因管道写满而阻塞。
+                last_score: Optional[float] = None
+                for line in proc.stderr:
+                    if b"VMAF score" not in line:
+                        continue
+                    match = _VMAF_SCORE_RE.search(line)
                     if match:
-                        return float(match.group(1))
-            
-            return None
+                        last_score = float(match.group(1))
+                        break
+                proc.stderr.read()
+                proc.wait()
+            finally:
+                unregister_process(proc)
+                proc.stderr.close()
+
+            return last_score
         except Exception as e:
-            warn(f"计算 VMAF 失败: {main_file.name} | {e}")
+            warn(f"计算 VMAF 失败: {label} | {e}")
             return None
 
+    def _vmaf_batch_cmd(self, pairs: List[Tuple[Path, Path]], model_str: str) -> List[str]:
+        cmd = [self.ffmpeg_bin]
+        graphs: List[str] = []
+        # 组内各 libvmaf 节点平分线程：一个进程合计约 self.threads 个线程，与逐个计算时相当
+        n_threads = max(1, self.threads // len(pairs))
+        for k, (ref_file, main_file) in enumerate(pairs):
+            cmd += ["-i", str(ref_file.absolute()), "-i", str(main_file.absolute())]
+            # libvmaf 期望输入顺序为 [distorted][reference]；每组输出独立的 JSON 日志
+            graphs.append(
+                f"[{2 * k + 1}:v][{2 * k}:v]libvmaf=model={model_str}:n_threads={n_threads}"
+                f":log_path=score{k}.json:log_fmt=json[v{k}]"
+            )
+        cmd += ["-filter_complex", ";".join(graphs)]
+        for k in range(len(pairs)):
+            cmd += ["-map", f"[v{k}]"]
+        cmd += ["-f", "null", "-"]
+        return cmd
+
+    @staticmethod
+    def _read_batch_scores(tmp_dir: str, count: int) -> List[Optional[float]]:
+        scores: List[Optional[float]] = [None] * count
+        for k in range(count):
+            log_file = Path(tmp_dir) / f"score{k}.json"
+            if not log_file.exists():
+                continue
+            try:
+                data = json.loads(log_file.read_text(encoding="utf-8"))
+                scores[k] = float(data["pooled_metrics"]["vmaf"]["mean"])
+            except (ValueError, KeyError, TypeError):
+                continue
+        return scores
+
+    def _batch_scores_or_none(self, returncode: int, tmp_dir: str, count: int) -> List[Optional[float]]:
+        """ffmpeg 中途失败时 libvmaf 仍会为已处理的帧写出 pooled 结果，分数不可信：整组返回 None，由调用方逐个重算。"""
+
+        if returncode != 0:
+            warn(f"批量计算 VMAF 失败 (ffmpeg 返回码 {returncode})，改为逐个计算。")
+            return [None] * count
+        return self._read_batch_scores(tmp_dir, count)
+
+    def calculate_vmaf_batch(
+        self,
+        pairs: List[Tuple[Path, Path]],
+        model_str: str,
+    ) -> List[Optional[float]]:
+        """在单个 ffmpeg 进程中计算多组 VMAF 分数，摊薄进程启动与 libvmaf 初始化开销。
+
+        :param pairs: [(参考视频, 压缩视频), ...]，要求共用同一个模型字符串。
+        :return: 与 pairs 一一对应的分数列表，失败项为 None。
+        """
+
+        cmd = self._vmaf_batch_cmd(pairs, model_str)
+        try:
+            # 在临时目录中运行，log_path 使用相对路径，避免滤镜参数中的路径转义问题
+            with tempfile.TemporaryDirectory(prefix="vmaf_batch_") as tmp_dir:
+                result = subprocess.run(
+                    cmd,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    cwd=tmp_dir,
+                    check=False,
+                )
+                return self._batch_scores_or_none(result.returncode, tmp_dir, len(pairs))
+        except Exception as e:
+            warn(f"批量计算 VMAF 失败: {e}")
+            return [None] * len(pairs)
+
+    async def _acalculate_vmaf_batch(
+        self,
+        pairs: List[Tuple[Path, Path]],
+        model_str: str,
+    ) -> List[Optional[float]]:
+        """`calculate_vmaf_batch` 的异步版本：在事件循环中等待 ffmpeg，不占用线程。"""
+
+        cmd = self._vmaf_batch_cmd(pairs, model_str)
+        try:
+            with tempfile.TemporaryDirectory(prefix="vmaf_batch_") as tmp_dir:
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.DEVNULL,
+                    cwd=tmp_dir,
+                    **NEW_GROUP_KWARGS,
+                )
+                handle = register_async_process(proc)
+                try:
+                    await proc.wait()
+                except asyncio.CancelledError:
+                    if proc.returncode is None:
+                        proc.kill()
+                        await proc.wait()
+                    raise
+                finally:
+                    await unregister_async_process(handle)
+                return self._batch_scores_or_none(proc.returncode, tmp_dir, len(pairs))
+        except OSError as e:
+            warn(f"批量计算 VMAF 失败: {e}")
+            return [None] * len(pairs)
+
+    @staticmethod
+    def _index_reference_dir(ref_dir: Path) -> dict[str, Path]:
+        """建立参考视频索引：stem -> Path，同名多个扩展名时按 _REF_EXT_PRIORITY 选择。
+
+        单次 scandir 遍历目录（扩展名不区分大小写），每个压缩文件只需一次字典查找。
+        """
+
+        ranked: dict[str, Tuple[int, Path]] = {}
+        try:
+            with os.scandir(ref_dir) as it:
+                for entry in it:
+                    stem, ext = os.path.splitext(entry.name)
+                    rank = _REF_EXT_PRIORITY.get(ext.lower())
+                    if rank is None or not entry.is_file():
+                        continue
+                    current = ranked.get(stem)
+                    if current is None or rank < current[0]:
+                        ranked[stem] = (rank, Path(entry.path))
+        except OSError:
+            return {}
+        return {stem: path for stem, (_, path) in ranked.items()}
+
     def process_files(
         self, 
         ref_dir: Path, 
         comp_files: List[Path], 
         output_csv: Path,
         jobs: int = 1,
-        use_neg_model: bool = False
+        use_neg_model: bool = False,
+        batch_size: int = VMAF_BATCH_SIZE,
     ):
-        """批量处理 VMAF 计算。"""
+        """批量处理 VMAF 计算。
+
+        相同模型（分辨率档位 + 是否 NEG）的文件按 batch_size 分组，每组只启动一个 ffmpeg；
+        各组由事件循环并发调度，最多同时运行 jobs 个 ffmpeg 进程（即 jobs 组）。
+        组内各文件平分 libvmaf 线程，jobs 对 CPU 的占用与逐个计算时一致；
+        但每个进程同时解码最多 2 * batch_size 路视频，内存占用随 batch_size 增长。
+        """
 
-        results = []
 
         # 确保输出目录存在
         output_csv.parent.mkdir(parents=True, exist_ok=True)
 
         phase_start("批量分析", f"开始 VMAF 分析，共 {len(comp_files)} 个文件")
 
-        # 建立参考视频索引：stem -> Path（按扩展名优先级选择）
-        ref_index: dict[str, Path] = {}
-        preferred_exts = [".mp4", ".mkv", ".mov", ".avi"]
-        if ref_dir.exists():
-            for ext in preferred_exts:
-                for p in ref_dir.glob(f"*{ext}"):
-                    if p.is_file() and p.stem not in ref_index:
-                        ref_index[p.stem] = p
-        
-        with ThreadPoolExecutor(max_workers=jobs) as executor:
-            future_to_file = {}
-            for comp_file in comp_files:
-                # 通过文件名寻找参考文件：去除压缩后缀后再匹配
-                clean_stem = strip_param_suffix(comp_file.stem)
-                ref_file = ref_index.get(clean_stem)
-
-                if not ref_file:
-                    warn(f"未找到参考视频 {comp_file.name} (期望 {clean_stem}.[mp4|mkv|...])")
-                    continue
-                
-                future = executor.submit(self._analyze_single, ref_file, comp_file, use_neg_model)
-                future_to_file[future] = comp_file
-                
-            # 收集结果
-            completed_count = 0
-            for future in as_completed(future_to_file):
-                comp_file = future_to_file[future]
-                try:
-                    res = future.result()
-                    if res:
-                        results.append(res)
-                        completed_count += 1
-                        progress(completed_count, len(future_to_file), f"完成 {comp_file.name}")
-                except Exception as exc:
-                    warn(f"任务异常: {exc}")
+        ref_index = self._index_reference_dir(ref_dir)
+
+        # 按模型字符串分桶：模型由参考分辨率与 use_neg_model 决定
+        buckets: dict[str, List[Tuple[Path, Path]]] = {}
+        for comp_file in comp_files:
+            # 通过文件名寻找参考文件：去除压缩后缀后再匹配
+            clean_stem = strip_param_suffix(comp_file.stem)
+            ref_file = ref_index.get(clean_stem)
+
+            if not ref_file:
+                warn(f"未找到参考视频 {comp_file.name} (期望 {clean_stem}.[mp4|mkv|...])")
+                continue
+
+            model_str = self.get_vmaf_model_str(ref_file, use_neg_model)
+            buckets.setdefault(model_str, []).append((ref_file, comp_file))
+
+        batch_size = max(1, batch_size)
+        total = sum(len(pairs) for pairs in buckets.values())
+
+        batches = [
+            (pairs[i:i + batch_size], model_str)
+            for model_str, pairs in buckets.items()
+            for i in range(0, len(pairs), batch_size)
+        ]
+        results = asyncio.run(self._analyze_batches_async(batches, total, jobs))
 
         # 写入 CSV（保持绘图脚本兼容格式）
         with open(output_csv, "w", newline="") as f:
@@ -251,16 +595,56 @@ class VMAFAnalyzer:
                 
         success(f"分析完成，结果已保存到 {output_csv}", leading_blank=True)
 
-    def _analyze_single(self, ref_file: Path, comp_file: Path, use_neg_model: bool):
-        resolution, model_str = self.get_vmaf_model_selection(ref_file, use_neg_model)
-
-        res_part = self.format_resolution_for_log(resolution, mode="paren")
-        phase_start(comp_file.name, f"开始 VMAF: 参考={ref_file.name} {res_part} | 模型={model_str}")
-
-        vmaf = self.calculate_vmaf(ref_file, comp_file, use_neg_model)
-        bitrate = self.get_bitrate(comp_file)
-        
-        if vmaf is not None and bitrate is not None:
-            # 与绘图脚本兼容的输出格式
-            return [comp_file.name, vmaf, bitrate]
-        return None
+    async def _analyze_batches_async(
+        self,
+        batches: List[Tuple[List[Tuple[Path, Path]], str]],
+        total: int,
+        jobs: int,
+    ) -> List[list]:
+        """并发分析各组文件，最多同时运行 jobs 组，按完成顺序汇报进度。"""
+
+        semaphore = asyncio.Semaphore(max(1, jobs))
+
+        async def _run_one(pairs: List[Tuple[Path, Path]], model_str: str):
+            async with semaphore:
+                return await self._analyze_batch(pairs, model_str)
+
+        results: List[list] = []
+        completed_count = 0
+        for future in asyncio.as_completed([_run_one(pairs, model_str) for pairs, model_str in batches]):
+            try:
+                batch_results = await future
+            except Exception as exc:
+                warn(f"任务异常: {exc}")
+                continue
+            for comp_file, res in batch_results:
+                if res:
+                    results.append(res)
+                    completed_count += 1
+                    progress(completed_count, total, f"完成 {comp_file.name}")
+        return results
+
+    async def _analyze_batch(self, pairs: List[Tuple[Path, Path]], model_str: str):
+        """分析一组共用模型的文件；单文件或批量失败的条目回退到逐个计算。"""
+
+        for ref_file, comp_file in pairs:
+            res_part = self.format_resolution_for_log(self.get_resolution(ref_file), mode="paren")
+            phase_start(comp_file.name, f"开始 VMAF: 参考={ref_file.name} {res_part} | 模型={model_str}")
+
+        if len(pairs) == 1:
+            scores: List[Optional[float]] = [None]
+        else:
+            scores = await self._acalculate_vmaf_batch(pairs, model_str)
+
+        batch_results = []
+        for (ref_file, comp_file), vmaf in zip(pairs, scores):
+            if vmaf is None:
+                vmaf = await self._acalculate_vmaf(ref_file, comp_file, model_str)
+            # VMAF 失败时该条目本就丢弃，不再为它启动 ffprobe
+            bitrate = await self._aget_bitrate(comp_file) if vmaf is not None else None
+            if vmaf is not None and bitrate is not None:
+                # 与绘图脚本兼容的输出格式
+                batch_results.append((comp_file, [comp_file.name, vmaf, bitrate]))
+            else:
+                batch_results.append((comp_file, None))
+        return batch_results
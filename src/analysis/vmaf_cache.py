@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.utils.console import warn
+
+# 默认缓存位置：跨运行复用同一份 VMAF 分数
+DEFAULT_VMAF_CACHE_PATH = Path.home() / ".cache" / "vct" / "vmaf.json"
+
+
+def make_score_key(
+    src_file: Path,
+    src_mtime_ns: int,
+    src_size: int,
+    dst_size: int,
+    encoder: str,
+    quality: int,
+    model_str: str,
+    n_subsample: int,
+) -> str:
+    """生成 VMAF 缓存键。
+
+    原视频以 (路径, mtime, 体积) 标识，压缩结果以 (编码器, 参数, 输出体积) 标识；
+    模型与抽帧间隔不同分数也不同，一并计入。
+    """
+
+    raw = "\0".join(
+        str(part)
+        for part in (src_file, src_mtime_ns, src_size, dst_size, encoder, quality, model_str, n_subsample)
+    )
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class VMAFScoreCache:
+    """以 JSON 文件持久化的 VMAF 分数缓存（线程安全）。
+
+    写入只更新内存并唤醒后台线程落盘，不阻塞分析线程；`close()` 时同步写出剩余改动。
+    """
+
+    def __init__(self, path: Path = DEFAULT_VMAF_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._scores: Dict[str, float] = self._load()
+        self._dirty = False
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, name="vmaf-cache-writer", daemon=True)
+        self._flusher.start()
+
+    def _load(self) -> Dict[str, float]:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            warn(f"VMAF 缓存读取失败，将重新建立: {self.path} | {exc}")
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return {k: float(v) for k, v in data.items() if isinstance(v, (int, float))}
+
+    def get(self, key: str) -> Optional[float]:
+        with self._lock:
+            return self._scores.get(key)
+
+    def put(self, key: str, score: float) -> None:
+        with self._lock:
+            if self._scores.get(key) == score:
+                return
+            self._scores[key] = score
+            self._dirty = True
+        self._wakeup.set()
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """把内存中的改动写回磁盘（先写临时文件再 os.replace，避免中断时损坏缓存）。"""
+
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = dict(self._scores)
+            self._dirty = False
+
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump(snapshot, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            warn(f"VMAF 缓存写入失败: {self.path} | {exc}")
+            tmp_path.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        """停止后台线程并同步写出剩余改动。"""
+
+        self._closed = True
+        self._wakeup.set()
+        self._flusher.join(timeout=5)
+        self.flush()
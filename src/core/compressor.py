@@ -1,81 +1,243 @@
+import asyncio
 import subprocess
 import time
-import shutil
 import threading
-from typing import Optional, TYPE_CHECKING
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple, TYPE_CHECKING
 from pathlib import Path
 from src.encoders.base import BaseEncoder
 from src.utils.console import error, info, success, warn
-from src.utils.file_ops import human_size
+from src.utils.file_ops import copy_file_replace, human_size
+from src.utils.compat import DATACLASS_SLOTS
+from src.utils.process import (
+    NEW_GROUP_KWARGS,
+    register_async_process,
+    register_process,
+    unregister_async_process,
+    unregister_process,
+)
 
 if TYPE_CHECKING:
     from src.analysis.vmaf import VMAFAnalyzer
 
+# 边压缩边评估时，经管道送给 VMAF 进程的封装格式（管道不可 seek，mp4 无法流式写出）
+FUSED_STREAM_FORMAT = "mpegts"
+
+# 仅保留 ffmpeg stderr 末尾的字节数（足以定位失败原因），避免长时间编码时进度日志占用大量内存
+STDERR_TAIL_BYTES = 8192
+_STDERR_CHUNK_BYTES = 65536
+# 体积提前终止：轮询输出文件体积的间隔，以及 terminate 后等待退出的宽限时间
+SIZE_WATCH_INTERVAL_SECONDS = 0.5
+SIZE_ABORT_GRACE_SECONDS = 2.0
+
+# 命令模板中的路径占位参数（整项匹配替换，不对其他参数做字符串格式化）
+_INPUT_PLACEHOLDER = "{INPUT}"
+_OUTPUT_PLACEHOLDER = "{OUTPUT}"
+
+
+@lru_cache(maxsize=128)
+def _command_template(
+    encoder: BaseEncoder, ffmpeg_threads: Optional[int], options: Tuple[Tuple[str, object], ...]
+) -> Tuple[str, ...]:
+    """按 (编码器, 线程数, 编码参数) 生成并缓存 ffmpeg 命令模板，输入/输出路径以占位符表示。
+
+    调度器对同一编码器反复探测有限的几个质量参数，参数列表只需构建一次。
+    """
+
+    cmd = encoder.get_ffmpeg_args(_INPUT_PLACEHOLDER, _OUTPUT_PLACEHOLDER, **dict(options))
+    if ffmpeg_threads and "-i" in cmd:
+        # 作为输入选项放在 -i 之前：限制解码线程，给并行的 VMAF 分析留出核心
+        i = cmd.index("-i")
+        cmd[i:i] = ["-threads", str(ffmpeg_threads)]
+    return tuple(cmd)
+
+
+@dataclass(**DATACLASS_SLOTS)
+class FFmpegResult:
+    """一次 ffmpeg 执行的结果。"""
+
+    returncode: int
+    stderr: bytes
+    # 输出体积超过阈值而被提前终止（此时 returncode 非 0，输出文件不完整）
+    aborted_by_size: bool = False
+
+
+class _StderrTail:
+    """只保留最近 STDERR_TAIL_BYTES 字节的 stderr 缓冲。"""
+
+    __slots__ = ("_buf",)
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+
+    def feed(self, chunk: bytes) -> None:
+        self._buf += chunk
+        # 超过两倍上限时才裁剪，摊薄 del 的内存搬移开销
+        if len(self._buf) > 2 * STDERR_TAIL_BYTES:
+            del self._buf[:-STDERR_TAIL_BYTES]
+
+    def getvalue(self) -> bytes:
+        return bytes(self._buf[-STDERR_TAIL_BYTES:])
+
 
 class Compressor:
-    def __init__(self, encoder: BaseEncoder, gpu_semaphore: Optional[threading.Semaphore] = None):
+    def __init__(
+        self,
+        encoder: BaseEncoder,
+        gpu_semaphore: Optional[threading.Semaphore] = None,
+        hardlink_fallback: bool = False,
+        ffmpeg_threads: Optional[int] = None,
+    ):
         self.encoder = encoder
         self.gpu_semaphore = gpu_semaphore
-        self._process_lock = threading.Lock()
-        self._running_processes: set[subprocess.Popen[bytes]] = set()
+        # 回退原视频时允许以硬链接代替复制（同一文件系统下仅元数据操作，但输出与原视频共享数据）
+        self.hardlink_fallback = hardlink_fallback
+        # ffmpeg 输入端 -threads（解码/滤镜线程数）；None 表示由 ffmpeg 自行决定
+        self.ffmpeg_threads = ffmpeg_threads
+
+    def _run_ffmpeg(
+        self,
+        cmd: list[str],
+        watch_path: Optional[Path] = None,
+        abort_above_bytes: Optional[int] = None,
+    ) -> FFmpegResult:
+        """执行 ffmpeg 命令并返回结果（stderr 仅保留末尾部分，stdout 丢弃）。
 
-    def _run_ffmpeg(self, cmd: list[str]) -> subprocess.CompletedProcess:
-        """执行 ffmpeg 命令并返回结果。"""
+        同时给出 watch_path 与 abort_above_bytes 时，编码期间轮询输出体积，
+        一旦超过阈值即终止进程（输出体积只增不减，越过阈值后最终结果必然超限）。
+        调用方须先删除 watch_path 上的旧文件（`_prepare_compress` 已处理），否则会在 ffmpeg 截断前读到旧体积。
+        """
         proc = subprocess.Popen(
             cmd,
-            stdout=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
             stderr=subprocess.PIPE,
+            **NEW_GROUP_KWARGS,
         )
-        with self._process_lock:
-            self._running_processes.add(proc)
+        register_process(proc)
+
+        watcher: Optional[threading.Thread] = None
+        stop_watch = threading.Event()
+        aborted = threading.Event()
+        if watch_path is not None and abort_above_bytes is not None:
+            watcher = threading.Thread(
+                target=self._watch_output_size,
+                args=(proc, watch_path, abort_above_bytes, stop_watch, aborted),
+                daemon=True,
+            )
+            watcher.start()
 
         try:
-            stdout, stderr = proc.communicate()
-            return subprocess.CompletedProcess(
-                args=cmd,
+            tail = _StderrTail()
+            self._drain_stderr_tail(proc, tail)
+            proc.wait()
+            return FFmpegResult(
                 returncode=proc.returncode,
-                stdout=stdout,
-                stderr=stderr,
+                stderr=tail.getvalue(),
+                aborted_by_size=aborted.is_set(),
             )
         finally:
-            with self._process_lock:
-                self._running_processes.discard(proc)
+            stop_watch.set()
+            if watcher is not None:
+                watcher.join()
+            unregister_process(proc)
+            proc.stderr.close()
 
-    def terminate_running_processes(self, grace_timeout: float = 2.0) -> int:
-        """终止当前所有运行中的 ffmpeg 子进程，返回处理数量。"""
-
-        with self._process_lock:
-            processes = list(self._running_processes)
+    async def _arun_ffmpeg(
+        self,
+        cmd: list[str],
+        watch_path: Optional[Path] = None,
+        abort_above_bytes: Optional[int] = None,
+    ) -> FFmpegResult:
+        """`_run_ffmpeg` 的异步版本：在事件循环中等待 ffmpeg，不占用线程。
 
-        if not processes:
-            return 0
+        体积提前终止语义与同步版本一致；协程被取消时会结束 ffmpeg 子进程。
+        """
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+            **NEW_GROUP_KWARGS,
+        )
+        # 子进程不在终端前台进程组，收不到 Ctrl+C：登记后由退出钩子兜底整组终止
+        handle = register_async_process(proc)
+        aborted = False
 
-        for proc in processes:
-            if proc.poll() is None:
+        async def _watch() -> None:
+            nonlocal aborted
+            while True:
+                await asyncio.sleep(SIZE_WATCH_INTERVAL_SECONDS)
                 try:
-                    proc.terminate()
-                except Exception:
+                    size = watch_path.stat().st_size
+                except OSError:
                     continue
+                if size > abort_above_bytes:
+                    aborted = True
+                    proc.terminate()
+                    try:
+                        await asyncio.wait_for(proc.wait(), SIZE_ABORT_GRACE_SECONDS)
+                    except asyncio.TimeoutError:
+                        proc.kill()
+                    return
+
+        watcher: Optional[asyncio.Task] = None
+        if watch_path is not None and abort_above_bytes is not None:
+            watcher = asyncio.ensure_future(_watch())
 
-        deadline = time.monotonic() + grace_timeout
-        for proc in processes:
-            if proc.poll() is not None:
+        try:
+            tail = _StderrTail()
+            while True:
+                chunk = await proc.stderr.read(_STDERR_CHUNK_BYTES)
+                if not chunk:
+                    break
+                tail.feed(chunk)
+            await proc.wait()
+        except asyncio.CancelledError:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            raise
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            # 其他异常退出时 ffmpeg 可能仍在运行：在事件循环中终止并等待，不能用阻塞式注销卡住其他协程
+            await unregister_async_process(handle)
+
+        return FFmpegResult(returncode=proc.returncode, stderr=tail.getvalue(), aborted_by_size=aborted)
+
+    def _watch_output_size(
+        self,
+        proc: subprocess.Popen,
+        watch_path: Path,
+        abort_above_bytes: int,
+        stop: threading.Event,
+        aborted: threading.Event,
+    ) -> None:
+        """轮询输出文件体积，超过阈值时终止 ffmpeg。"""
+
+        while not stop.wait(SIZE_WATCH_INTERVAL_SECONDS):
+            try:
+                size = watch_path.stat().st_size
+            except OSError:
                 continue
-            remain = max(0.0, deadline - time.monotonic())
+            if size <= abort_above_bytes:
+                continue
+
+            aborted.set()
             try:
-                proc.wait(timeout=remain)
-            except Exception:
-                if proc.poll() is None:
-                    try:
-                        proc.kill()
-                    except Exception:
-                        pass
-                    try:
-                        proc.wait(timeout=1.0)
-                    except Exception:
-                        pass
+                proc.terminate()
+                proc.wait(timeout=SIZE_ABORT_GRACE_SECONDS)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+            except OSError:
+                pass
+            return
+
+    def _drain_stderr_tail(self, proc: subprocess.Popen, tail: "_StderrTail") -> None:
+        """读取进程 stderr 直到 EOF，仅保留末尾部分。"""
 
-        return len(processes)
+        for chunk in iter(lambda: proc.stderr.read1(_STDERR_CHUNK_BYTES), b""):
+            tail.feed(chunk)
 
     def _should_direct_copy(self, input_file: Path) -> bool:
         """判断当前输入是否应直接复制而非压缩。"""
@@ -106,94 +268,359 @@ class Compressor:
             size_limit=max_size_ratio,
             max_analyze_workers=1,
         )
-        scheduler.start([(input_file, output_file)])
+        scheduler.start([(input_file, output_file, input_file.name)])
         return output_file.exists()
 
-    def compress_file(
-        self, 
-        input_file: Path, 
-        output_file: Path, 
-        max_ratio: Optional[float] = 0.8,
-        verbose: bool = True,
-        **kwargs
-    ) -> bool:
-        """
-        压缩单个文件。
-        如果成功返回 True，否则返回 False。
-        :param max_ratio: 如果设置为 (0.0-1.0)，当压缩后体积 > 原体积 * max_ratio 时，放弃压缩，直接使用原视频；传 None 表示禁用该回退。
+    def _prepare_compress(
+        self,
+        input_file: Path,
+        output_file: Path,
+        verbose: bool,
+        **kwargs,
+    ) -> Tuple[Optional[bool], List[str]]:
+        """压缩前的公共步骤（同步/异步共用）。
+
+        返回 (结果, 命令)：若无需执行 ffmpeg（输入缺失、JPG 直接复制），结果非 None 且命令为空。
+        需要执行 ffmpeg 时，返回前已删除输出位置上的旧文件。
         """
         if not input_file.exists():
             error(f"输入文件不存在 {input_file}")
-            return False
+            return False, []
 
         # 如果输出目录不存在则创建
         output_file.parent.mkdir(parents=True, exist_ok=True)
 
         if self._should_direct_copy(input_file):
             try:
-                if output_file.exists():
-                    output_file.unlink()
-                shutil.copy2(input_file, output_file)
+                copy_file_replace(input_file, output_file)
                 if verbose:
                     info(f"检测到 JPG，直接复制: {input_file.name} -> {output_file.name}", leading_blank=True)
-                return True
+                return True, []
             except Exception as exc:
                 if verbose:
                     error(f"JPG 直接复制失败: {exc}")
-                return False
+                return False, []
         
         # 构建命令
-        cmd = self.encoder.get_ffmpeg_args(input_file, output_file, **kwargs)
+        try:
+            template = _command_template(self.encoder, self.ffmpeg_threads, tuple(sorted(kwargs.items())))
+        except TypeError:
+            # 参数值不可哈希时无法缓存，直接构建
+            template = _command_template.__wrapped__(
+                self.encoder, self.ffmpeg_threads, tuple(sorted(kwargs.items()))
+            )
+        paths = {_INPUT_PLACEHOLDER: str(input_file), _OUTPUT_PLACEHOLDER: str(output_file)}
+        cmd = [paths.get(arg, arg) for arg in template]
+
+        # 编码前先删除已存在的输出：它可能是回退时与原视频共享数据的硬链接，
+        # ffmpeg -y 以截断方式打开会直接改写原视频；删除只断开链接，原视频不受影响
+        output_file.unlink(missing_ok=True)
 
         if verbose:
             info(f"开始压缩: {input_file.name} -> {output_file.name}", leading_blank=True)
             info(f"编码器: {self.encoder.name}")
 
-        start_time = time.time()
+        return None, cmd
+
+    def _finish_compress(
+        self,
+        input_file: Path,
+        output_file: Path,
+        result: FFmpegResult,
+        start_time: float,
+        max_ratio: Optional[float],
+        verbose: bool,
+    ) -> bool:
+        """ffmpeg 结束后的公共步骤：失败清理、体积统计与体积限制回退。"""
+
+        if result.aborted_by_size:
+            if verbose:
+                warn(f"体积限制触发: 输出已超过 {max_ratio*100}%，提前终止压缩并回退到原视频。", leading_blank=True)
+            self.promote_original(input_file, output_file)
+            return True
+
+        if result.returncode != 0:
+            if verbose:
+                error(f"压缩失败: {input_file.name}", leading_blank=True)
+                error(result.stderr.decode(errors="ignore"))
+            output_file.unlink(missing_ok=True)
+            return False
+            
+        elapsed = time.time() - start_time
+        src_size = input_file.stat().st_size
+        dst_size = output_file.stat().st_size
+        ratio = dst_size / src_size if src_size > 0 else 0
+        ratio_percent = ratio * 100
+        
+        if verbose:
+            success(
+                f"用时: {elapsed:.2f}s | 体积: {human_size(src_size)} -> {human_size(dst_size)} ({ratio_percent:.2f}%)",
+                leading_blank=True,
+            )
+        
+        # 检查体积限制
+        if max_ratio is not None and ratio > max_ratio:
+            if verbose:
+                warn(f"体积限制触发: 比例 {ratio_percent:.2f}% > {max_ratio*100}%，回退到原视频。")
+            self.promote_original(input_file, output_file)
         
+        return True
+
+    def promote_original(self, input_file: Path, output_file: Path) -> None:
+        """将原视频放到输出位置（体积限制回退等场景），优先使用 reflink / 硬链接等免复制方式。"""
+
+        copy_file_replace(input_file, output_file, allow_hardlink=self.hardlink_fallback)
+
+    def _cleanup_failed_output(self, output_file: Path, exc: Exception, verbose: bool) -> None:
+        """执行 ffmpeg 出现异常时清理不完整的输出。"""
+
+        try:
+            output_file.unlink(missing_ok=True)
+        except OSError:
+            pass
+        if verbose:
+            error(f"执行 ffmpeg 出错: {exc}")
+
+    def encode(
+        self,
+        input_file: Path,
+        output_file: Path,
+        abort_above_bytes: Optional[int] = None,
+        **kwargs
+    ) -> FFmpegResult:
+        """执行一次编码并返回原始结果（不打印日志、不做体积回退），供调度器使用。
+
+        :param abort_above_bytes: 输出体积超过该字节数时提前终止编码；None 表示不限制。
+        失败或提前终止时删除不完整的输出。
+        """
+
+        done, cmd = self._prepare_compress(input_file, output_file, verbose=False, **kwargs)
+        if done is not None:
+            return FFmpegResult(returncode=0 if done else 1, stderr=b"")
+
+        try:
+            if self.gpu_semaphore:
+                with self.gpu_semaphore:
+                    result = self._run_ffmpeg(cmd, output_file, abort_above_bytes)
+            else:
+                result = self._run_ffmpeg(cmd, output_file, abort_above_bytes)
+        except Exception as e:
+            self._cleanup_failed_output(output_file, e, verbose=False)
+            return FFmpegResult(returncode=1, stderr=str(e).encode())
+
+        if result.returncode != 0 or result.aborted_by_size:
+            output_file.unlink(missing_ok=True)
+        return result
+
+    def sample_compress(
+        self,
+        input_file: Path,
+        output_file: Path,
+        sample_seconds: float,
+        total_seconds: float,
+        **kwargs
+    ) -> Optional[int]:
+        """只编码开头 sample_seconds 秒，按时长比例外推整段输出的字节数。
+
+        用于在完整编码前粗略判断体积是否会超限；样本文件用后即删除。失败时返回 None。
+        """
+
+        done, cmd = self._prepare_compress(input_file, output_file, verbose=False, **kwargs)
+        if done is not None or not cmd or total_seconds <= 0:
+            return None
+
+        # -t 作为输出选项放在输出路径之前
+        cmd[-1:-1] = ["-t", f"{sample_seconds:g}"]
         try:
             if self.gpu_semaphore:
                 with self.gpu_semaphore:
                     result = self._run_ffmpeg(cmd)
             else:
                 result = self._run_ffmpeg(cmd)
-            
             if result.returncode != 0:
-                if verbose:
-                    error(f"压缩失败: {input_file.name}", leading_blank=True)
-                    error(result.stderr.decode(errors="ignore"))
-                if output_file.exists():
-                    output_file.unlink()
-                return False
-                
-            elapsed = time.time() - start_time
-            src_size = input_file.stat().st_size
-            dst_size = output_file.stat().st_size
-            ratio = dst_size / src_size if src_size > 0 else 0
-            ratio_percent = ratio * 100
-            
-            if verbose:
-                success(
-                    f"用时: {elapsed:.2f}s | 体积: {human_size(src_size)} -> {human_size(dst_size)} ({ratio_percent:.2f}%)",
-                    leading_blank=True,
-                )
-            
-            # 检查体积限制
-            if max_ratio is not None and ratio > max_ratio:
-                if verbose:
-                    warn(f"体积限制触发: 比例 {ratio_percent:.2f}% > {max_ratio*100}%，回退到原视频。")
-                if output_file.exists():
-                    output_file.unlink()
-                shutil.copy2(input_file, output_file)
-            
-            return True
+                return None
+            sample_size = output_file.stat().st_size
+        except Exception:
+            return None
+        finally:
+            output_file.unlink(missing_ok=True)
+
+        return int(sample_size * total_seconds / min(sample_seconds, total_seconds))
+
+    def compress_file(
+        self, 
+        input_file: Path, 
+        output_file: Path, 
+        max_ratio: Optional[float] = 0.8,
+        verbose: bool = True,
+        **kwargs
+    ) -> bool:
+        """
+        压缩单个文件。
+        如果成功返回 True，否则返回 False。
+        :param max_ratio: 如果设置为 (0.0-1.0)，当压缩后体积 > 原体积 * max_ratio 时，放弃压缩，直接使用原视频；传 None 表示禁用该回退。
+        """
+        done, cmd = self._prepare_compress(input_file, output_file, verbose, **kwargs)
+        if done is not None:
+            return done
+
+        start_time = time.time()
+        abort_above_bytes = None
+        if max_ratio is not None:
+            abort_above_bytes = int(input_file.stat().st_size * max_ratio)
+        
+        try:
+            if self.gpu_semaphore:
+                with self.gpu_semaphore:
+                    result = self._run_ffmpeg(cmd, output_file, abort_above_bytes)
+            else:
+                result = self._run_ffmpeg(cmd, output_file, abort_above_bytes)
+
+            return self._finish_compress(input_file, output_file, result, start_time, max_ratio, verbose)
 
         except Exception as e:
-            if output_file.exists():
+            self._cleanup_failed_output(output_file, e, verbose)
+            return False
+
+    @staticmethod
+    def _escape_tee_slave(path: Path) -> str:
+        """转义 tee 复用器输出列表中的特殊字符。"""
+
+        text = str(path)
+        for ch in ("\\", "'", "|", "[", "]"):
+            text = text.replace(ch, "\\" + ch)
+        return text
+
+    def _build_fused_cmd(self, cmd: List[str]) -> List[str]:
+        """把普通压缩命令改写为 tee 输出：一路写文件，一路以 FUSED_STREAM_FORMAT 写到 stdout。
+
+        约定编码器命令以输出路径结尾；tee 需要显式 -map，这里选取首路视频与全部音频（可选）。
+        管道一路仅含视频，且 onfail=ignore：VMAF 进程异常退出时文件输出不受影响。
+        """
+
+        output = cmd[-1]
+        tee_spec = (
+            f"{self._escape_tee_slave(Path(output))}"
+            f"|[f={FUSED_STREAM_FORMAT}:select=v:onfail=ignore]pipe:1"
+        )
+        return [*cmd[:-1], "-map", "0:v:0", "-map", "0:a?", "-f", "tee", tee_spec]
+
+    def compress_and_score(
+        self,
+        input_file: Path,
+        output_file: Path,
+        vmaf_analyzer: "VMAFAnalyzer",
+        model_str: Optional[str] = None,
+        reference_cache: Optional[Path] = None,
+        **kwargs
+    ) -> Tuple[bool, Optional[float]]:
+        """压缩的同时计算 VMAF，返回 (压缩是否成功, VMAF 分数)。
+
+        编码进程通过 tee 同时写出文件与管道，VMAF 进程直接从管道读取压缩流，
+        省去“压缩结束后再从磁盘读取并解码一遍临时文件”的独立分析阶段。
+        同一个滤镜图无法对自身编码器的输出评分，因此仍是两个进程，只是并行流水。
+        分数为 None 表示 VMAF 侧失败（压缩结果仍可用），调用方可回退独立分析。
+        """
+
+        done, cmd = self._prepare_compress(input_file, output_file, verbose=False, **kwargs)
+        if done is not None:
+            return done, None
+
+        cmd = self._build_fused_cmd(cmd)
+        score: Optional[float] = None
+
+        try:
+            if self.gpu_semaphore:
+                self.gpu_semaphore.acquire()
+            try:
+                proc = subprocess.Popen(
+                    cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **NEW_GROUP_KWARGS
+                )
+                register_process(proc)
                 try:
-                    output_file.unlink()
-                except Exception:
-                    pass
-            if verbose:
-                error(f"执行 ffmpeg 出错: {e}")
+                    tail = _StderrTail()
+                    drainer = threading.Thread(
+                        target=self._drain_stderr_tail, args=(proc, tail), daemon=True
+                    )
+                    drainer.start()
+                    score = vmaf_analyzer.calculate_vmaf_stream(
+                        input_file,
+                        proc.stdout,
+                        FUSED_STREAM_FORMAT,
+                        model_str=model_str,
+                        reference_cache=reference_cache,
+                        n_subsample=vmaf_analyzer.probe_subsample,
+                    )
+                    # VMAF 进程已持有管道副本；关闭本进程的读端，避免编码端在 VMAF 退出后阻塞
+                    proc.stdout.close()
+                    proc.wait()
+                    drainer.join()
+                finally:
+                    unregister_process(proc)
+            finally:
+                if self.gpu_semaphore:
+                    self.gpu_semaphore.release()
+        except Exception as e:
+            self._cleanup_failed_output(output_file, e, verbose=False)
+            return False, None
+
+        if proc.returncode != 0:
+            output_file.unlink(missing_ok=True)
+            return False, None
+        return True, score
+
+    async def compress_file_async(
+        self,
+        input_file: Path,
+        output_file: Path,
+        max_ratio: Optional[float] = 0.8,
+        verbose: bool = True,
+        **kwargs
+    ) -> bool:
+        """`compress_file` 的异步版本，便于调用方用 `asyncio.gather` 并发处理多个文件。
+
+        ffmpeg 通过 `asyncio.create_subprocess_exec` 启动，等待期间不占用线程。
+        """
+        done, cmd = self._prepare_compress(input_file, output_file, verbose, **kwargs)
+        if done is not None:
+            return done
+
+        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        abort_above_bytes = None
+        if max_ratio is not None:
+            abort_above_bytes = int(input_file.stat().st_size * max_ratio)
+
+        try:
+            if self.gpu_semaphore:
+                # threading.Semaphore 不能直接 await，放到默认线程池中获取
+                await loop.run_in_executor(None, self.gpu_semaphore.acquire)
+            try:
+                result = await self._arun_ffmpeg(cmd, output_file, abort_above_bytes)
+            finally:
+                if self.gpu_semaphore:
+                    self.gpu_semaphore.release()
+
+            return self._finish_compress(input_file, output_file, result, start_time, max_ratio, verbose)
+
+        except Exception as e:
+            self._cleanup_failed_output(output_file, e, verbose)
             return False
+
+    async def compress_files_async(
+        self,
+        jobs: List[Tuple[Path, Path, dict]],
+        max_concurrency: int = 1,
+    ) -> List[bool]:
+        """并发压缩多个文件，最多同时运行 max_concurrency 个 ffmpeg。
+
+        :param jobs: [(输入, 输出, compress_file 关键字参数), ...]
+        """
+
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def _run_one(input_file: Path, output_file: Path, options: dict) -> bool:
+            async with semaphore:
+                return await self.compress_file_async(input_file, output_file, **options)
+
+        return list(await asyncio.gather(*(_run_one(inp, out, opts) for inp, out, opts in jobs)))
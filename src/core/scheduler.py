@@ -1,14 +1,22 @@
+import atexit
+import os
+import sys
 import threading
-import queue
-import shutil
+import heapq
 import time
 import itertools
+import uuid
 from pathlib import Path
-from dataclasses import dataclass
-from typing import Optional, List, Tuple
+from dataclasses import dataclass, field
+from typing import FrozenSet, Optional, List, Tuple
 
 from src.core.compressor import Compressor
 from src.analysis.vmaf import VMAFAnalyzer
+from src.analysis.vmaf_cache import VMAFScoreCache, make_score_key
+from src.encoders.base import BaseEncoder
+from src.utils.file_ops import copy_file_replace, move_file_replace
+from src.utils.compat import DATACLASS_SLOTS
+from src.utils.process import terminate_live_processes
 from src.utils.console import (
     error,
     info,
@@ -23,10 +31,114 @@ from src.utils.console import (
 AnalyzeQueueItem = Tuple[int, int, "VideoTask"]
 CompQueueItem = Tuple[int, int, "VideoTask"]
 JPG_SUFFIXES = {".jpg", ".jpeg"}
-BACKPRESSURE_SLEEP_SECONDS = 0.05
+# 硬件编码器可同时运行的会话数（NVENC/QSV 多个编码引擎并发时近似线性扩展）；未列出的编码器串行压缩
+HW_ENCODER_SESSIONS = {"nvidia": 2, "intel": 2}
+# 主线程等待全部任务完成：POSIX 下无超时等待也能被 Ctrl+C 打断；
+# Windows 下无超时的 Event.wait 不响应 KeyboardInterrupt，只能短超时轮询
+DONE_WAIT_TIMEOUT = 0.5 if sys.platform == "win32" else None
 
 
-@dataclass
+# Linux 下分析线程（及其派生的 VMAF 进程）降低的调度优先级，以及分得的 CPU 比例
+ANALYZE_NICENESS = 5
+ANALYZE_CPU_FRACTION = 4  # 分析占 1/4 的核心，其余留给压缩
+# 可用核心少于该值时不做绑核，仅调整优先级
+MIN_CPUS_FOR_PARTITION = 4
+
+# 插值选点：最近两次 VMAF 差值低于该值时视为斜率过小，退回二分中点
+INTERP_MIN_SCORE_DELTA = 0.05
+# 区间宽度不小于该值时，插值点限制在区间内侧 1/4 处
+INTERP_MARGIN_MIN_WIDTH = 8
+
+# 抽样预估体积：外推结果超过体积上限的该倍数才判定超限（开头片段码率与全片有偏差，留出余量）
+PRESAMPLE_SIZE_MARGIN = 1.1
+# 原视频时长不足抽样时长的该倍数时不抽样（抽样成本接近完整编码，且外推无意义）
+PRESAMPLE_MIN_DURATION_FACTOR = 4
+
+# 中间文件名标记：`.{stem}.vct-{token}.{kind}{suffix}`，以点开头便于文件管理器隐藏
+TEMP_SLOT_MARKER = ".vct-"
+
+
+def plan_cpu_partition() -> Tuple[Optional[FrozenSet[int]], Optional[FrozenSet[int]]]:
+    """把当前可用核心划分为 (分析, 压缩) 两组；平台不支持或核心太少时返回 (None, None)。"""
+
+    if not hasattr(os, "sched_getaffinity"):
+        return None, None
+    try:
+        cpus = sorted(os.sched_getaffinity(0))
+    except OSError:
+        return None, None
+    if len(cpus) < MIN_CPUS_FOR_PARTITION:
+        return None, None
+
+    n_analyze = max(1, len(cpus) // ANALYZE_CPU_FRACTION)
+    return frozenset(cpus[:n_analyze]), frozenset(cpus[n_analyze:])
+
+
+def apply_thread_cpu_policy(cpus: Optional[FrozenSet[int]], niceness: int = 0) -> None:
+    """为当前线程设置 CPU 亲和性与优先级（此后由该线程启动的 ffmpeg 会继承）。
+
+    仅在 Linux 上生效：Linux 的 nice / sched_setaffinity(0) 作用于调用线程，
+    而 macOS 等平台的 nice 作用于整个进程，会连带拖慢压缩线程。
+    """
+
+    if not sys.platform.startswith("linux"):
+        return
+    if niceness:
+        try:
+            os.nice(niceness)
+        except OSError:
+            pass
+    if cpus:
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError:
+            pass
+
+
+def default_compress_workers(encoder: BaseEncoder) -> int:
+    """按编码器类型返回默认压缩线程数。"""
+
+    return HW_ENCODER_SESSIONS.get(encoder.name, 1)
+
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class EncoderProfile:
+    """编码器质量参数的一次性快照，调度过程中不再反复访问编码器属性。"""
+
+    step: int
+    min_q: int
+    max_q: int
+    default_q: int
+    valid_set: frozenset
+    # 质量范围内全部参数有效时为 True，可跳过逐个有效性检查
+    all_valid: bool
+    # 编码器已知的“安全参数”及其 VMAF 下限（safe_q 为 None 表示不做预测）
+    safe_q: Optional[int]
+    floor_score: float
+    # 每档参数的典型 VMAF 增量（仅一次实测时用于预测目标参数；None 表示退回中点）
+    vmaf_slope: Optional[float]
+
+    @classmethod
+    def from_encoder(cls, encoder: BaseEncoder) -> "EncoderProfile":
+        min_q, max_q = encoder.quality_range
+        if encoder.HAS_QUALITY_FILTER:
+            valid_set = frozenset(q for q in range(min_q, max_q + 1) if encoder.is_valid_quality(q))
+        else:
+            valid_set = frozenset(range(min_q, max_q + 1))
+        return cls(
+            step=encoder.quality_step,
+            min_q=min_q,
+            max_q=max_q,
+            default_q=encoder.default_quality,
+            valid_set=valid_set,
+            all_valid=len(valid_set) == max_q - min_q + 1,
+            safe_q=encoder.vmaf_safe_quality,
+            floor_score=encoder.vmaf_floor_score,
+            vmaf_slope=encoder.vmaf_slope,
+        )
+
+
+@dataclass(**DATACLASS_SLOTS)
 class VideoTask:
     input_path: Path
     output_path: Path
@@ -38,10 +150,51 @@ class VideoTask:
     min_q: int
     max_q: int
 
-    # 运行时产物
+    # 二分搜索区间（闭区间，随每轮结果收缩）
+    lo_q: int
+    hi_q: int
+
+    # 输出路径的分解结果（任务创建时计算一次，拼接槽位路径时不再拆分 Path）
+    out_parent: Optional[Path] = None
+    out_stem: str = ""
+    out_suffix: str = ""
+
+    # 固定的中间文件槽位（任务创建时确定，每轮探测原地覆盖）。
+    # 探测结果被采用时与对应槽位互换角色而不是 rename，槽位文件名中的 kind 仅表示初始用途。
+    slot_token: str = ""
+    probe_slot: Optional[Path] = None
+    spec_slot: Optional[Path] = None
+    best_effort_slot: Optional[Path] = None
+
+    # 运行时产物（非 None 表示对应槽位中有有效文件）
     temp_file: Optional[Path] = None
+    # 当前最佳候选：有达标结果时为“最差质量（最小体积）的达标结果”，否则为 VMAF 最高的未达标结果
     best_effort_file: Optional[Path] = None
     best_effort_score: float = -1.0
+    # 最佳候选的字节数（成为最佳候选时由 last_dst_size 记录，落盘时直接算压缩比）
+    best_effort_size: Optional[int] = None
+    best_passing_q: Optional[int] = None
+    # 实测的 (q, VMAF) 序列，用于插值估计目标 VMAF 对应的参数
+    history: List[Tuple[int, float]] = field(default_factory=list)
+    # 最佳候选的分数来自编码器安全参数预测（未实际计算 VMAF）
+    best_effort_predicted: bool = False
+    # 最近一次触发体积限制的参数；非 None 且无达标结果时严格回退原视频
+    size_capped_q: Optional[int] = None
+
+    # 预压缩（分析进行中，压缩线程空闲时提前压缩下一个可能的探测参数）
+    spec_q: Optional[int] = None
+    spec_file: Optional[Path] = None
+    spec_size: Optional[int] = None
+    spec_state: Optional[str] = None  # None / "running" / "done" / "failed" / "oversize"（体积超限提前终止）
+    # 分析已结束但预压缩仍在运行：由压缩线程在预压缩完成后继续推进
+    spec_waiting: bool = False
+
+    # 参考视频无损缓存（启用 reference_cache 时由首次分析生成，后续探测复用）
+    ref_cache: Optional[Path] = None
+    ref_cache_failed: bool = False
+    # VMAF 模型选择（任务创建时确定一次，各轮分析/复核直接复用）
+    vmaf_resolution: Optional[Tuple[int, int]] = None
+    vmaf_model: Optional[str] = None
 
     # 最终结果
     final_vmaf: Optional[float] = None
@@ -50,31 +203,91 @@ class VideoTask:
 
     # 元数据
     src_size: int = 0
+    src_mtime_ns: int = 0
+    # 原视频时长（秒），仅启用抽样预估体积时探测
+    src_duration: Optional[float] = None
+    # 最近一次压缩产物的体积（避免分析阶段重复 stat）
+    last_dst_size: Optional[int] = None
     attempts: int = 0
+    finished: bool = False
+
+    def slot_path(self, kind: str, suffix: Optional[str] = None) -> Path:
+        """返回任务固定的中间文件路径：`.{stem}.vct-{token}.{kind}{suffix}`。"""
+
+        return self.out_parent / f".{self.out_stem}{TEMP_SLOT_MARKER}{self.slot_token}.{kind}{suffix or self.out_suffix}"
 
 class SmartScheduler:
     def __init__(self, compressor: Compressor, vmaf: VMAFAnalyzer, 
-                 target_vmaf: float, size_limit: float, max_analyze_workers: int = 4,
+                 target_vmaf: float, size_limit: float, max_analyze_workers: int = 2,
                  max_pending_analyses: Optional[int] = None,
-                 queue_debug: bool = False):
+                 queue_debug: bool = False,
+                 speculative_probes: bool = True,
+                 reference_cache: bool = False,
+                 max_compress_workers: Optional[int] = None,
+                 fused_scoring: bool = False,
+                 cpu_partition: bool = True,
+                 vmaf_shortcut: bool = True,
+                 vmaf_cache: Optional[VMAFScoreCache] = None,
+                 max_attempts: Optional[int] = None,
+                 size_presample: Optional[float] = None):
         self.compressor = compressor
+        self.profile = EncoderProfile.from_encoder(compressor.encoder)
         self.vmaf = vmaf
         self.target_vmaf = target_vmaf
         self.size_limit = size_limit
         self.max_analyze_workers = max_analyze_workers
+        if max_compress_workers is None:
+            max_compress_workers = default_compress_workers(compressor.encoder)
+        self.max_compress_workers = max(1, max_compress_workers)
+        # 分析线程降优先级并绑定到少量核心，避免 libvmaf 占满 CPU 拖慢编码
+        self.cpu_partition = cpu_partition
+        if cpu_partition:
+            self._analyze_cpus, self._compress_cpus = plan_cpu_partition()
+        else:
+            self._analyze_cpus, self._compress_cpus = None, None
+        if vmaf.n_threads is None:
+            # 分析线程平分可用核心给各自的 libvmaf（绑核时只算分析核心），避免线程数过多互相争抢
+            available = len(self._analyze_cpus) if self._analyze_cpus else (os.cpu_count() or 1)
+            vmaf.n_threads = max(1, available // max(1, max_analyze_workers))
+        if compressor.ffmpeg_threads is None:
+            # 压缩侧同理：绑核时按压缩核心平分，否则为分析线程预留核心后平分
+            if self._compress_cpus:
+                available = len(self._compress_cpus)
+            else:
+                available = max(1, (os.cpu_count() or 1) - self.max_analyze_workers - 1)
+            compressor.ffmpeg_threads = max(1, available // self.max_compress_workers)
         self.queue_debug = queue_debug
+        # 边压缩边评估时压缩线程自身承担 VMAF，不存在“分析进行中、压缩线程空闲”的窗口
+        self.fused_scoring = fused_scoring
+        self.speculative_probes = speculative_probes and not fused_scoring
+        self.reference_cache = reference_cache
+        self.vmaf_shortcut = vmaf_shortcut
+        self.vmaf_cache = vmaf_cache
+        # 每个任务的最大压缩探测次数（None 表示不限，直到搜索区间收敛）
+        self.max_attempts = max_attempts
+        # 完整压缩前先编码开头若干秒外推体积（None 表示不抽样）
+        self.size_presample = size_presample
 
         # 队列
-        self.comp_queue = queue.PriorityQueue()
-        self.analyze_queue = queue.PriorityQueue()
+        # 两个 heapq 优先队列共用一把锁（背压判断需要同时读取两个队列），
+        # 但各自有条件变量：入队只唤醒一个同类等待者，避免分析线程增多时每次入队惊醒全部线程
+        self.comp_queue: List[CompQueueItem] = []
+        self.analyze_queue: List[AnalyzeQueueItem] = []
+        self._queue_lock = threading.Lock()
+        self._comp_cv = threading.Condition(self._queue_lock)
+        self._analyze_cv = threading.Condition(self._queue_lock)
 
         # 同步控制
         self.active_tasks_count = 0
+        self.active_speculations = 0
         self.lock = threading.Lock()
+        # 所有任务（含预压缩）结束时置位，主线程据此退出等待
+        self._done = threading.Event()
         self.workers: List[threading.Thread] = []
         self.shutdown_flag = False
         self.interrupted = False
         self.results: List[VideoTask] = []
+        self._tasks: List[VideoTask] = []
         self.comp_seq = itertools.count()
         self.analyze_seq = itertools.count()
         self._backpressure_waiting_logged = False
@@ -99,7 +312,7 @@ class SmartScheduler:
         info(
             f"[队列调试] {queue_name} {action} | 文件={task.display_name} | "
             f"attempts={task.attempts} | priority={priority} | seq={seq} | "
-            f"comp_q={self.comp_queue.qsize()} | analyze_q={self.analyze_queue.qsize()}"
+            f"comp_q={len(self.comp_queue)} | analyze_q={len(self.analyze_queue)}"
         )
 
     def _abort_if_interrupted(self, task: VideoTask) -> bool:
@@ -110,29 +323,26 @@ class SmartScheduler:
         self._abort_task(task)
         return True
 
-    def _requeue_comp_task(self, task: VideoTask, front: bool = True) -> None:
-        """按优先级将任务重新放回压缩队列。"""
-
-        if self._abort_if_interrupted(task):
-            return
-        if front:
-            self._put_comp_queue_front(task)
-        else:
-            self._put_comp_queue(task, high_priority=False)
-
     def _should_wait_for_backpressure(self) -> bool:
-        """判断是否应在压缩出队前等待分析队列消化。"""
-
-        if self.analyze_queue.qsize() < self.max_pending_analyses:
-            return False
-
-        with self.comp_queue.mutex:
-            if not self.comp_queue.queue:
-                return False
-            head_priority, _seq, _task = self.comp_queue.queue[0]
-
-        # 仅当队首是首轮任务（priority >= 0）时启用等待；重试任务（priority < 0）仍然优先推进。
-        return head_priority >= 0
+        """判断首轮任务是否应等待分析队列消化（调用方需持有 _queue_lock）。"""
+
+        return len(self.analyze_queue) >= self.max_pending_analyses
+
+    def _pop_retry_item(self) -> Optional[CompQueueItem]:
+        """背压期间跳过首轮任务，取出最早的重试任务（调用方需持有 _queue_lock）；没有则返回 None。"""
+
+        queue = self.comp_queue
+        if queue[0][0] > 0:
+            return heapq.heappop(queue)
+        retries = [k for k, item in enumerate(queue) if item[0] > 0]
+        if not retries:
+            return None
+        k = min(retries, key=lambda i: queue[i])
+        item = queue[k]
+        queue[k] = queue[-1]
+        queue.pop()
+        heapq.heapify(queue)
+        return item
 
     def _log_backpressure_wait(self) -> None:
         """按需打印背压等待日志（单次）。"""
@@ -141,17 +351,27 @@ class SmartScheduler:
             return
         self._backpressure_waiting_logged = True
         info(
-            f"[队列调试] comp 等待背压 | analyze_q={self.analyze_queue.qsize()} | "
-            f"阈值={self.max_pending_analyses} | comp_q={self.comp_queue.qsize()}"
+            f"[队列调试] comp 等待背压 | analyze_q={len(self.analyze_queue)} | "
+            f"阈值={self.max_pending_analyses} | comp_q={len(self.comp_queue)}"
         )
 
     def _mark_task_done(self, task: VideoTask, record_result: bool = True) -> None:
         """更新任务计数并按需记录结果。"""
 
         with self.lock:
+            if task.finished:
+                return
+            task.finished = True
             self.active_tasks_count -= 1
             if record_result:
                 self.results.append(task)
+            self._signal_if_idle()
+
+    def _signal_if_idle(self) -> None:
+        """在持有 self.lock 时调用：没有活动任务与预压缩时唤醒主线程。"""
+
+        if self.active_tasks_count == 0 and self.active_speculations == 0:
+            self._done.set()
 
     def _abort_task(self, task: VideoTask) -> None:
         """中断场景下快速终止任务：仅清理中间文件，不回退复制原视频。"""
@@ -169,62 +389,100 @@ class SmartScheduler:
             if not root.exists():
                 continue
 
-            for pattern in ("*_temp_q*.*", "*_best_effort.*"):
+            for pattern in (f".*{TEMP_SLOT_MARKER}*", ".*.copy.tmp"):
                 for candidate in root.rglob(pattern):
                     if candidate in visited or not candidate.is_file():
                         continue
                     visited.add(candidate)
 
-                    existed_before = candidate.exists()
-                    self._safe_unlink(candidate)
-                    if existed_before and not candidate.exists():
+                    if self._safe_unlink(candidate):
                         deleted += 1
 
         return deleted
 
-    def _safe_unlink(self, path: Optional[Path]) -> None:
-        """安全删除文件（不存在或删除失败都不会抛异常）。"""
+    def _safe_unlink(self, path: Optional[Path]) -> bool:
+        """安全删除文件（不存在或删除失败都不会抛异常），实际删除时返回 True。"""
 
         if not path:
-            return
+            return False
         try:
-            path.unlink(missing_ok=True)
-        except Exception:
-            return
+            path.unlink()
+            return True
+        except OSError:
+            return False
 
-    def _drain_queue(self, q: "queue.Queue") -> List[VideoTask]:
-        """尽量清空队列并返回其中的任务列表。"""
+    def _drain_queue(self, q: List[Tuple[int, int, VideoTask]]) -> List[VideoTask]:
+        """清空队列并返回其中的任务列表。"""
 
-        drained: List[VideoTask] = []
-        while True:
-            try:
-                item = q.get_nowait()
-                if isinstance(item, tuple) and len(item) >= 3 and isinstance(item[2], VideoTask):
-                    drained.append(item[2])
-                elif isinstance(item, VideoTask):
-                    drained.append(item)
-                q.task_done()
-            except queue.Empty:
-                break
+        with self._queue_lock:
+            drained = [task for _priority, _seq, task in q]
+            q.clear()
         return drained
 
-    def _put_comp_queue(self, task: VideoTask, high_priority: bool = False) -> None:
-        """将任务放入压缩队列；重试轮次越高优先级越高，同层保持 FIFO。"""
+    def _push_queue(
+        self,
+        q: List[Tuple[int, int, VideoTask]],
+        item: Tuple[int, int, VideoTask],
+        cv: threading.Condition,
+    ) -> None:
+        """入队并唤醒一个该队列的等待者（每次只新增一个任务，唤醒一个即可）。"""
 
-        if high_priority:
-            # 重试层级优先：attempts 越大（重试越深），priority 越小（越先执行）
-            priority = -max(1, task.attempts)
-        else:
-            # 首轮任务统一最低优先级
-            priority = 0
-        seq = next(self.comp_seq)
-        self.comp_queue.put((priority, seq, task))
-        self._log_queue_event("comp", "入队", task, priority, seq)
+        with cv:
+            heapq.heappush(q, item)
+            cv.notify()
 
-    def _put_comp_queue_front(self, task: VideoTask) -> None:
-        """将任务以高优先级放入压缩队列（同优先级 FIFO）。"""
+    def _stop_workers(self) -> None:
+        """置位退出标志并唤醒所有在队列上等待的工作线程，使其退出循环。"""
 
-        self._put_comp_queue(task, high_priority=True)
+        with self._queue_lock:
+            self.shutdown_flag = True
+            self._comp_cv.notify_all()
+            self._analyze_cv.notify_all()
+
+    def _pop_comp_queue(self) -> Optional[CompQueueItem]:
+        """取出下一个压缩任务；背压生效时等待分析队列消化。退出时返回 None。"""
+
+        with self._comp_cv:
+            while not self.shutdown_flag:
+                if self.comp_queue:
+                    if not self._should_wait_for_backpressure():
+                        self._backpressure_waiting_logged = False
+                        return heapq.heappop(self.comp_queue)
+                    # 首轮任务暂缓，重试任务不受背压限制
+                    item = self._pop_retry_item()
+                    if item is not None:
+                        return item
+                    self._log_backpressure_wait()
+                # 入队、分析出队（背压解除）与 _stop_workers 都会唤醒，无需超时轮询
+                self._comp_cv.wait()
+        return None
+
+    def _pop_analyze_queue(self) -> Optional[AnalyzeQueueItem]:
+        """取出下一个分析任务；出队可能解除背压，因此唤醒等待中的压缩线程。退出时返回 None。"""
+
+        with self._analyze_cv:
+            while not self.shutdown_flag:
+                if self.analyze_queue:
+                    was_full = self._should_wait_for_backpressure()
+                    item = heapq.heappop(self.analyze_queue)
+                    if was_full and self.comp_queue:
+                        # 背压解除：可能有多个压缩线程在等待首轮任务
+                        self._comp_cv.notify_all()
+                    return item
+                self._analyze_cv.wait()
+        return None
+
+    def _put_comp_queue(self, task: VideoTask) -> None:
+        """将任务放入压缩队列；首轮任务优先，重试按轮次由浅到深，同层保持 FIFO。
+
+        priority 即已完成的探测次数：新视频（0）先于重试开始压缩，
+        使分析线程尽早拿到多个视频的首轮结果，而不是等某个视频的深层重试。
+        """
+
+        priority = task.attempts
+        seq = next(self.comp_seq)
+        self._push_queue(self.comp_queue, (priority, seq, task), self._comp_cv)
+        self._log_queue_event("comp", "入队", task, priority, seq)
 
     def _put_analyze_queue(self, task: VideoTask, high_priority: bool = False) -> None:
         """将任务放入分析队列；重试轮次越高优先级越高，同层保持 FIFO。"""
@@ -234,34 +492,35 @@ class SmartScheduler:
         else:
             priority = 0
         seq = next(self.analyze_seq)
-        self.analyze_queue.put((priority, seq, task))
+        self._push_queue(self.analyze_queue, (priority, seq, task), self._analyze_cv)
         self._log_queue_event("analyze", "入队", task, priority, seq)
 
     def _cleanup_task_intermediates(self, task: VideoTask) -> None:
-        """清理任务所有中间产物（临时文件与最佳候选文件）。"""
-
-        candidates: set[Path] = set()
-
-        if task.temp_file:
-            candidates.add(task.temp_file)
-        if task.best_effort_file:
-            candidates.add(task.best_effort_file)
-
-        output_dir = task.output_path.parent
-        temp_pattern = f"{task.output_path.stem}_temp_q*{task.output_path.suffix}"
-        for path in output_dir.glob(temp_pattern):
-            candidates.add(path)
-
-        best_effort_path = task.output_path.with_name(
-            f"{task.output_path.stem}_best_effort{task.output_path.suffix}"
-        )
-        candidates.add(best_effort_path)
-
-        for candidate in candidates:
+        """清理任务所有中间产物（探测槽位、最佳候选、空闲的预压缩槽位与参考缓存）。"""
+
+        spec_running = task.spec_state == "running"
+        for candidate in (
+            task.probe_slot,
+            task.best_effort_slot,
+            None if spec_running else task.spec_slot,
+            task.ref_cache,
+        ):
             self._safe_unlink(candidate)
 
         task.temp_file = None
         task.best_effort_file = None
+        task.ref_cache = None
+        if not spec_running:
+            self._clear_speculation(task)
+
+    def _cleanup_unfinished_slots(self) -> None:
+        """进程退出兜底（atexit）：删除仍未结束任务的中间文件槽位。"""
+
+        for task in self._tasks:
+            if task.finished:
+                continue
+            for candidate in (task.probe_slot, task.spec_slot, task.best_effort_slot, task.ref_cache):
+                self._safe_unlink(candidate)
 
     def start(self, videos: List[Tuple[Path, Path, str]]):
         """启动调度器并阻塞等待所有任务完成。"""
@@ -272,17 +531,23 @@ class SmartScheduler:
 
         section("智能压缩调度")
         info(f"初始化调度器，共 {len(videos)} 个视频。")
-        info(f"压缩线程: 1 | 分析线程: {self.max_analyze_workers}")
+        info(
+            f"压缩线程: {self.max_compress_workers} | 分析线程: {self.max_analyze_workers} "
+            f"(ffmpeg -threads={self.compressor.ffmpeg_threads} | libvmaf n_threads={self.vmaf.threads})"
+        )
 
         # 1. 入队初始任务
         for inp, out, display_name in videos:
             self._create_and_queue_task(inp, out, display_name)
 
+        atexit.register(self._cleanup_unfinished_slots)
+
         # 2. 启动线程
-        t_comp = threading.Thread(target=self._compression_worker, name="Worker-Compress")
-        t_comp.daemon = True
-        t_comp.start()
-        self.workers.append(t_comp)
+        for i in range(self.max_compress_workers):
+            t_comp = threading.Thread(target=self._compression_worker, name=f"Worker-Compress-{i}")
+            t_comp.daemon = True
+            t_comp.start()
+            self.workers.append(t_comp)
 
         # 分析线程（并行）
         for i in range(self.max_analyze_workers):
@@ -291,21 +556,21 @@ class SmartScheduler:
             t_ana.start()
             self.workers.append(t_ana)
 
-        # 3. 主循环监控
+        # 3. 主线程阻塞等待完成信号（最后一个任务结束时由 _signal_if_idle 唤醒）
+        with self.lock:
+            self._signal_if_idle()
+
         interrupted = False
         try:
-            while True:
-                with self.lock:
-                    if self.active_tasks_count == 0 and self.comp_queue.empty() and self.analyze_queue.empty():
-                        break
-                time.sleep(1)
+            while not self._done.wait(timeout=DONE_WAIT_TIMEOUT):
+                pass
         except KeyboardInterrupt:
             warn("用户中断，正在停止...", leading_blank=True)
-            self.shutdown_flag = True
             self.interrupted = True
+            self._stop_workers()
             interrupted = True
 
-            killed = self.compressor.terminate_running_processes()
+            killed = terminate_live_processes()
             if killed > 0:
                 info(f"中断时已终止 {killed} 个 ffmpeg 子进程。")
                 time.sleep(0.2)
@@ -322,30 +587,33 @@ class SmartScheduler:
         if interrupted:
             warn("已中断，已尽量回收未开始处理的任务。")
         else:
+            self._stop_workers()
             success("全部任务完成。")
 
+        atexit.unregister(self._cleanup_unfinished_slots)
         self._print_summary()
 
     def _create_and_queue_task(self, inp: Path, out: Path, display_name: Optional[str] = None):
-        if not inp.exists():
+        # 单次 stat 同时完成存在性检查与体积读取
+        try:
+            src_stat = inp.stat()
+        except OSError:
             error(f"输入文件缺失 {inp}")
             return
 
-        enc = self.compressor.encoder
+        profile = self.profile
         
-        # 起点策略：从“更差质量、更小体积”开始，逐步提高质量
-        step = enc.quality_step
-        min_q, max_q = enc.quality_range
+        # 起点策略：从推荐值附近“更差质量、更小体积”的一侧开始，之后在整个质量范围内二分
+        step = profile.step
+        min_q, max_q = profile.min_q, profile.max_q
         
         if step > 0:
             # Mac: q:v 越大质量越高
-            start_q = enc.default_quality - 1
+            start_q = profile.default_q - 1
         else:
             # Intel/Nvidia: QP/global_quality 越小质量越高
-            start_q = enc.default_quality + 1
-        
-        src_size = inp.stat().st_size
-        
+            start_q = profile.default_q + 1
+
         task = VideoTask(
             input_path=inp,
             output_path=out,
@@ -354,30 +622,345 @@ class SmartScheduler:
             step_direction=step,
             min_q=min_q,
             max_q=max_q,
-            src_size=src_size
+            lo_q=min_q,
+            hi_q=max_q,
+            src_size=src_stat.st_size,
+            src_mtime_ns=src_stat.st_mtime_ns,
         )
+        task.out_parent, task.out_stem, task.out_suffix = out.parent, out.stem, out.suffix
+        task.vmaf_resolution, task.vmaf_model = self.vmaf.get_vmaf_model_selection(inp)
+        if self.size_presample and inp.suffix.lower() not in JPG_SUFFIXES:
+            task.src_duration = self.vmaf.get_duration(inp)
+        task.slot_token = uuid.uuid4().hex[:8]
+        task.probe_slot = task.slot_path("probe")
+        task.spec_slot = task.slot_path("spec")
+        task.best_effort_slot = task.slot_path("best")
+
+        snapped = self._snap_valid_quality(min_q, max_q, min(max(start_q, min_q), max_q))
+        if snapped is None:
+            error(f"{task.display_name} | 质量范围内没有可用参数。")
+            return
+        task.current_q = snapped
+
+        # 任务全部在 start() 启动工作线程之前创建，此时没有并发写者，计数无需加锁；
+        # 递减只发生在 _mark_task_done 中（与结果记录、完成信号同属一次加锁）
+        self.active_tasks_count += 1
+        self._tasks.append(task)
         
+        self._put_comp_queue(task)
+
+    def _snap_valid_quality(self, lo_q: int, hi_q: int, q: int) -> Optional[int]:
+        """在 [lo_q, hi_q] 内寻找离 q 最近的有效参数（主要针对 macOS 的重复参数）；没有则返回 None。"""
+
+        if lo_q > hi_q:
+            return None
+        if self.profile.all_valid:
+            return min(max(q, lo_q), hi_q)
+
+        valid_set = self.profile.valid_set
+        max_offset = max(q - lo_q, hi_q - q)
+        for offset in range(max_offset + 1):
+            for candidate in (q - offset, q + offset):
+                if lo_q <= candidate <= hi_q and candidate in valid_set:
+                    return candidate
+        return None
+
+    def _bounds_after(self, task: VideoTask, q: int, toward_worse: bool) -> Tuple[int, int]:
+        """返回在 q 处得到结论后的新搜索区间。
+
+        - toward_worse=True：q 已达标或体积超限，只保留比 q 质量更差（体积更小）的参数。
+        - toward_worse=False：q 未达标（或压缩失败），只保留比 q 质量更好的参数。
+        """
+
+        step = abs(task.step_direction)
+        # step_direction > 0 时数值越大质量越好，反之数值越小质量越好
+        move_up = (task.step_direction > 0) != toward_worse
+        if move_up:
+            return max(task.lo_q, q + step), task.hi_q
+        return task.lo_q, min(task.hi_q, q - step)
+
+    def _narrow_toward_worse(self, task: VideoTask, q: int) -> None:
+        task.lo_q, task.hi_q = self._bounds_after(task, q, toward_worse=True)
+
+    def _narrow_toward_better(self, task: VideoTask, q: int) -> None:
+        task.lo_q, task.hi_q = self._bounds_after(task, q, toward_worse=False)
+
+    def _pick_probe_q(self, lo_q: int, hi_q: int, task: Optional[VideoTask] = None) -> Optional[int]:
+        """选取下一个探测参数：有足够历史时按插值估计，否则取区间中点；区间为空时返回 None。"""
+
+        if lo_q > hi_q:
+            return None
+        lo_q, hi_q = self._clip_to_safe_quality(lo_q, hi_q)
+        q = self._estimate_crossing_q(task, lo_q, hi_q) if task is not None else None
+        if q is None:
+            q = (lo_q + hi_q) // 2
+        return self._snap_valid_quality(lo_q, hi_q, q)
+
+    def _clip_to_safe_quality(self, lo_q: int, hi_q: int) -> Tuple[int, int]:
+        """安全参数捷径生效时，把区间中比安全参数质量更好的一侧截掉。
+
+        安全参数本身即可判定达标且体积更小，更好的参数不可能成为最终结果，不值得探测；
+        区间整体位于该侧时保持原样。
+        """
+
+        safe_q = self.profile.safe_q
+        if not self.vmaf_shortcut or safe_q is None or self.target_vmaf > self.profile.floor_score:
+            return lo_q, hi_q
+        if self.profile.step > 0:
+            # 数值越大质量越好：丢弃 > safe_q 的部分
+            return (lo_q, min(hi_q, safe_q)) if lo_q <= safe_q else (lo_q, hi_q)
+        return (max(lo_q, safe_q), hi_q) if hi_q >= safe_q else (lo_q, hi_q)
+
+    def _estimate_crossing_q(self, task: VideoTask, lo_q: int, hi_q: int) -> Optional[int]:
+        """用最近两次实测 (q, VMAF) 线性插值，估计达到目标 VMAF 的参数。
+
+        VMAF 随质量参数单调变化，插值点通常比中点更接近目标，可减少探测次数。
+        只有一次实测时改用编码器的典型斜率（vmaf_slope）从该点外推。
+        vmaf_slope 只是粗略估计，外推与插值结果一律限制在宽区间内侧 1/4 处，保证每轮至少收缩 1/4：
+        估计偏差较大（或未产生新实测点而反复从同一点外推）时也不会被夹在区间边缘逐档移动；
+        窄区间（< INTERP_MARGIN_MIN_WIDTH）直接采用估计点，以便一步落到边界参数。
+        样本不足或斜率过小时返回 None。
+        """
+
+        if not task.history:
+            return None
+        if len(task.history) == 1:
+            slope = self.profile.vmaf_slope
+            if not slope:
+                return None
+            q1, s1 = task.history[0]
+            # step 的符号即“更高质量”的方向
+            q = q1 + (self.target_vmaf - s1) / slope * (1 if self.profile.step > 0 else -1)
+        else:
+            (q0, s0), (q1, s1) = task.history[-2:]
+            if q0 == q1 or abs(s1 - s0) < INTERP_MIN_SCORE_DELTA:
+                return None
+            q = q1 + (self.target_vmaf - s1) * (q1 - q0) / (s1 - s0)
+
+        width = hi_q - lo_q + 1
+        margin = width // 4 if width >= INTERP_MARGIN_MIN_WIDTH else 0
+        return min(max(round(q), lo_q + margin), hi_q - margin)
+
+    def _schedule_next_probe(self, task: VideoTask) -> None:
+        """推进二分搜索：还有候选参数则回到压缩队列，否则结束任务。
+
+        若该任务的预压缩仍在运行，则交由压缩线程在预压缩结束后再推进。
+        """
+
         with self.lock:
-            self.active_tasks_count += 1
-        
-        self._put_comp_queue(task, high_priority=False)
+            if task.spec_state == "running":
+                task.spec_waiting = True
+                return
 
-    def _compression_worker(self):
-        while not self.shutdown_flag:
-            if self._should_wait_for_backpressure():
-                self._log_backpressure_wait()
-                time.sleep(BACKPRESSURE_SLEEP_SECONDS)
-                continue
+        if self.max_attempts is not None and task.attempts >= self.max_attempts:
+            self._discard_speculation(task)
+            self._finish_search(task, exhausted=False)
+            return
 
-            self._backpressure_waiting_logged = False
+        next_q = None
+        if (
+            task.spec_state in ("done", "oversize")
+            and task.spec_q is not None
+            and task.lo_q <= task.spec_q <= task.hi_q
+        ):
+            # 预压缩结果落在新区间内，同样是一次有效探测，直接复用
+            next_q = task.spec_q
+        else:
+            self._discard_speculation(task)
+            next_q = self._pick_probe_q(task.lo_q, task.hi_q, task)
 
-            try:
-                # 使用超时便于检查退出标志
-                _item: CompQueueItem = self.comp_queue.get(timeout=1)
-                _priority, _seq, task = _item
-                self._log_queue_event("comp", "出队", task, _priority, _seq)
-            except queue.Empty:
-                continue
+        if next_q is None:
+            self._finish_search(task)
+            return
+
+        task.current_q = next_q
+        if self._abort_if_interrupted(task):
+            return
+        self._put_comp_queue(task)
+
+    def _size_abort_bytes(self, task: VideoTask) -> Optional[int]:
+        """编码输出超过该字节数即必然超出体积上限，可提前终止。"""
+
+        if task.src_size <= 0:
+            return None
+        return int(task.src_size * self.size_limit)
+
+    def _presample_ratio(self, task: VideoTask) -> Optional[float]:
+        """编码开头 size_presample 秒并外推整段体积比例；未启用、时长过短或抽样失败时返回 None。"""
+
+        seconds = self.size_presample
+        if not seconds or task.src_duration is None or task.src_size <= 0:
+            return None
+        if task.src_duration < seconds * PRESAMPLE_MIN_DURATION_FACTOR:
+            return None
+
+        phase_start(task.display_name, f"抽样预估体积 (Q={task.current_q}，前 {seconds:g} 秒)")
+        projected = self.compressor.sample_compress(
+            task.input_path,
+            task.probe_slot,
+            seconds,
+            task.src_duration,
+            quality=task.current_q,
+        )
+        if projected is None:
+            phase_end(task.display_name, "抽样失败，直接完整压缩")
+            return None
+        ratio = projected / task.src_size
+        phase_end(task.display_name, f"预估体积 {ratio:.2%}")
+        return ratio
+
+    def _plan_speculation(self, task: VideoTask) -> Optional[int]:
+        """压缩线程即将空闲时，为“本轮未达标”分支预先选定下一个探测参数。"""
+
+        if not self.speculative_probes or self.shutdown_flag or self.comp_queue:
+            return None
+
+        lo_q, hi_q = self._bounds_after(task, task.current_q, toward_worse=False)
+        spec_q = self._pick_probe_q(lo_q, hi_q)
+        if spec_q is None:
+            return None
+
+        with self.lock:
+            task.spec_q = spec_q
+            task.spec_file = task.spec_slot
+            task.spec_size = None
+            task.spec_state = "running"
+            task.spec_waiting = False
+            self.active_speculations += 1
+        return spec_q
+
+    def _run_speculation(self, task: VideoTask) -> None:
+        """在压缩线程中执行预压缩；若分析已先结束，则在此继续推进任务。"""
+
+        phase_start(task.display_name, f"空闲预压缩 (Q={task.spec_q})")
+        ok = False
+        size: Optional[int] = None
+        oversize = False
+        try:
+            result = self.compressor.encode(
+                task.input_path,
+                task.spec_file,
+                abort_above_bytes=self._size_abort_bytes(task),
+                quality=task.spec_q,
+            )
+            ok = result.returncode == 0
+            oversize = result.aborted_by_size
+            if ok:
+                size = task.spec_file.stat().st_size
+        except Exception as exc:
+            warn(f"{task.display_name} | 预压缩异常: {exc}")
+            ok = False
+        phase_end(task.display_name, "预压缩完成")
+
+        with self.lock:
+            if oversize:
+                task.spec_state = "oversize"
+            else:
+                task.spec_state = "done" if ok and size is not None else "failed"
+            task.spec_size = size
+            resume = task.spec_waiting
+            task.spec_waiting = False
+            self.active_speculations -= 1
+            finished = task.finished
+            self._signal_if_idle()
+
+        if finished:
+            self._discard_speculation(task)
+            return
+        if resume:
+            self._schedule_next_probe(task)
+
+    def _adopt_speculation(self, task: VideoTask) -> Optional[str]:
+        """若当前探测参数已有预压缩结果，则直接作为本轮压缩产物。
+
+        返回被采用的预压缩状态（"done" / "oversize"），无可用结果时返回 None。
+        """
+
+        state = task.spec_state
+        if state not in ("done", "oversize") or task.spec_q != task.current_q:
+            return None
+        if state == "done":
+            # 移入探测槽位，空出预压缩槽位供下一次预压缩使用
+            # 预压缩槽位直接成为本轮探测槽位；原探测槽位留给下一次预压缩（编码前会先删除旧文件）
+            task.probe_slot, task.spec_slot = task.spec_slot, task.probe_slot
+            task.temp_file = task.probe_slot
+            task.last_dst_size = task.spec_size
+        self._clear_speculation(task)
+        return state
+
+    def _discard_speculation(self, task: VideoTask) -> None:
+        """删除未被采用的预压缩结果。"""
+
+        if task.spec_state in ("done", "failed", "oversize"):
+            self._safe_unlink(task.spec_file)
+        self._clear_speculation(task)
+
+    def _clear_speculation(self, task: VideoTask) -> None:
+        task.spec_q = None
+        task.spec_file = None
+        task.spec_size = None
+        task.spec_state = None
+        task.spec_waiting = False
+
+    def _finish_search(self, task: VideoTask, exhausted: bool = True) -> None:
+        """搜索结束后的落盘策略（exhausted=False 表示因达到最大探测次数提前结束）。"""
+
+        if task.best_passing_q is not None:
+            success(f"{task.display_name} | 达到目标 VMAF (Q={task.best_passing_q})。")
+            self._verify_final_score(task)
+            self._finalize_task(task, use_best_effort=True)
+            return
+
+        if task.size_capped_q is not None:
+            # 更高质量会超出体积限制、更低质量又未达标：严格回退到原视频
+            warn(f"{task.display_name} | 触发体积限制且无达标结果，回退到原视频。")
+            self._cleanup_task_intermediates(task)
+            task.final_q = task.size_capped_q
+            self._finalize_task(task, use_best_effort=False)
+            return
+
+        if exhausted:
+            warn(f"{task.display_name} | 已搜索完整个质量范围，未达到目标 VMAF。")
+        else:
+            warn(f"{task.display_name} | 已达到最大探测次数 ({self.max_attempts})，未达到目标 VMAF。")
+        self._verify_final_score(task)
+        self._finalize_task(task, use_best_effort=True)
+
+    def _verify_final_score(self, task: VideoTask) -> None:
+        """探测阶段使用了抽帧 VMAF 时，以 final_subsample 复核最终候选的分数。"""
+
+        if self.vmaf.final_subsample >= self.vmaf.probe_subsample:
+            return
+        if task.best_effort_file is None or task.best_effort_predicted or self.interrupted:
+            return
+
+        phase_start(task.display_name, f"复核最终结果 VMAF (Q={task.final_q})")
+        score = self.vmaf.calculate_vmaf(
+            task.input_path,
+            task.best_effort_file,
+            model_str=task.vmaf_model,
+            reference_cache=task.ref_cache,
+            n_subsample=self.vmaf.final_subsample,
+        )
+        phase_end(task.display_name, "复核完成")
+        if score is None:
+            warn(f"{task.display_name} | 复核 VMAF 失败，沿用抽帧分数 {task.best_effort_score:.2f}。")
+            return
+
+        info(f"{task.display_name} | 复核 VMAF={score:.2f}（抽帧估计 {task.best_effort_score:.2f}）")
+        if task.best_passing_q is not None and score < self.target_vmaf:
+            warn(f"{task.display_name} | 复核分数低于目标 VMAF {self.target_vmaf:.2f}，抽帧估计存在偏差。")
+        task.best_effort_score = score
+
+    def _compression_worker(self):
+        if self.cpu_partition:
+            apply_thread_cpu_policy(self._compress_cpus)
+        while not self.shutdown_flag:
+            _item = self._pop_comp_queue()
+            if _item is None:
+                break
+            _priority, _seq, task = _item
+            self._log_queue_event("comp", "出队", task, _priority, _seq)
 
             try:
                 self._process_compression(task)
@@ -386,16 +969,16 @@ class SmartScheduler:
                 self._safe_unlink(task.temp_file)
                 self._safe_unlink(task.best_effort_file)
                 self._finalize_task(task, use_best_effort=False)
-            self.comp_queue.task_done()
 
     def _analysis_worker(self):
+        if self.cpu_partition:
+            apply_thread_cpu_policy(self._analyze_cpus, ANALYZE_NICENESS)
         while not self.shutdown_flag:
-            try:
-                _item: AnalyzeQueueItem = self.analyze_queue.get(timeout=1)
-                _priority, _seq, task = _item
-                self._log_queue_event("analyze", "出队", task, _priority, _seq)
-            except queue.Empty:
-                continue
+            _item = self._pop_analyze_queue()
+            if _item is None:
+                break
+            _priority, _seq, task = _item
+            self._log_queue_event("analyze", "出队", task, _priority, _seq)
 
             try:
                 self._process_analysis(task)
@@ -404,7 +987,6 @@ class SmartScheduler:
                 self._safe_unlink(task.temp_file)
                 self._safe_unlink(task.best_effort_file)
                 self._finalize_task(task, use_best_effort=True)
-            self.analyze_queue.task_done()
 
     def _process_compression(self, task: VideoTask):
         """执行压缩步骤。"""
@@ -416,76 +998,124 @@ class SmartScheduler:
         if task.input_path.suffix.lower() in JPG_SUFFIXES:
             info(f"{task.display_name} | 检测到 JPG，直接复制。", leading_blank=True)
             task.output_path.parent.mkdir(parents=True, exist_ok=True)
-            if task.output_path.exists():
-                task.output_path.unlink()
-            shutil.copy2(task.input_path, task.output_path)
+            copy_file_replace(task.input_path, task.output_path)
             self._finalize_task(task, keep_output=True)
             return
 
-        # 先做范围检查
-        if not (task.min_q <= task.current_q <= task.max_q):
-            warn(f"{task.display_name} | 已达到质量范围边界 (Q={task.current_q})，停止。")
-            self._finalize_task(task, use_best_effort=True)
-            return
-
-        # 跳过无效质量值（主要针对 macOS）
-        if not self.compressor.encoder.is_valid_quality(task.current_q):
-            info(f"{task.display_name} | 跳过无效参数 Q={task.current_q}")
-            task.current_q += task.step_direction
-            self._requeue_comp_task(task, front=True)
-            return
-
-        phase_start(task.display_name, f"开始压缩 (Q={task.current_q})")
+        fused_score: Optional[float] = None
+        size_aborted = False
+        presample_skipped = False
+        predicted = self._predicts_pass(task)
+        adopted = self._adopt_speculation(task)
+        if adopted is not None:
+            info(f"{task.display_name} | 复用预压缩结果 (Q={task.current_q})")
+            success = True
+            size_aborted = adopted == "oversize"
+        else:
+            task.temp_file = task.probe_slot
+            estimated_ratio = self._presample_ratio(task)
+            if estimated_ratio is not None and estimated_ratio > self.size_limit * PRESAMPLE_SIZE_MARGIN:
+                # 抽样外推已明显超限：不做完整压缩，按体积超限处理
+                success = True
+                size_aborted = presample_skipped = True
+            else:
+                phase_start(task.display_name, f"开始压缩 (Q={task.current_q})")
+
+                if self.fused_scoring and not predicted:
+                    # 边压缩边评估：编码输出经管道直接送入 VMAF 进程
+                    success, fused_score = self.compressor.compress_and_score(
+                        task.input_path,
+                        task.temp_file,
+                        self.vmaf,
+                        model_str=task.vmaf_model,
+                        reference_cache=self._ensure_reference_cache(task),
+                        quality=task.current_q,
+                    )
+                else:
+                    # 执行压缩（体积回退由调度器控制；输出一旦超过体积上限即提前终止）
+                    result = self.compressor.encode(
+                        task.input_path,
+                        task.temp_file,
+                        abort_above_bytes=self._size_abort_bytes(task),
+                        quality=task.current_q,
+                    )
+                    success = result.returncode == 0 or result.aborted_by_size
+                    size_aborted = result.aborted_by_size
+
+                phase_end(task.display_name, "压缩完成")
 
-        # 临时输出路径
-        task.temp_file = task.output_path.with_name(
-            f"{task.output_path.stem}_temp_q{task.current_q}{task.output_path.suffix}"
-        )
-        
-        # 执行压缩（不使用 max_ratio，体积检查由调度器控制）
-        success = self.compressor.compress_file(
-            task.input_path,
-            task.temp_file,
-            max_ratio=None,
-            quality=task.current_q,
-            verbose=False,
-        )
-        
-        phase_end(task.display_name, "压缩完成")
-        
         if not success:
             warn(f"{task.display_name} | 压缩失败。")
-            # 失败后尝试下一个参数
-            task.current_q += task.step_direction
-            self._requeue_comp_task(task, front=True)
-            return
-
-        # 体积检查
-        if not task.temp_file.exists(): 
-            self._finalize_task(task, use_best_effort=True)
+            # 失败后排除该参数，继续向更高质量方向搜索
+            self._narrow_toward_better(task, task.current_q)
+            self._schedule_next_probe(task)
             return
 
-        dst_size = task.temp_file.stat().st_size
-        ratio = dst_size / task.src_size if task.src_size > 0 else 1.0
+        if presample_skipped:
+            ratio_str = f"抽样预估 {estimated_ratio:.2%}，跳过完整压缩"
+        elif size_aborted:
+            ratio_str = f"> {self.size_limit:.2%}，已提前终止压缩"
+        else:
+            # 体积检查：预压缩结果已记录体积；否则单次 stat 同时完成存在性检查并缓存体积
+            dst_size = task.last_dst_size if adopted == "done" else None
+            if dst_size is None:
+                try:
+                    dst_size = task.temp_file.stat().st_size
+                except OSError:
+                    self._finalize_task(task, use_best_effort=True)
+                    return
+                task.last_dst_size = dst_size
+
+            ratio = dst_size / task.src_size if task.src_size > 0 else 1.0
+            ratio_str = f"{ratio:.2%}"
         
-        if ratio > self.size_limit:
-            warn(f"{task.display_name} | 超过体积限制 ({ratio:.2%})。")
+        if size_aborted or ratio > self.size_limit:
+            warn(f"{task.display_name} | 超过体积限制 ({ratio_str})，向更低质量方向搜索。")
             self._safe_unlink(task.temp_file)
             task.temp_file = None
-
-            self._cleanup_task_intermediates(task)
-
-            # 触发体积限制后，严格回退到原视频
-            warn(f"{task.display_name} | 触发体积限制，回退到原视频。")
-            task.final_q = task.current_q
-            self._finalize_task(task, use_best_effort=False)
+            task.size_capped_q = task.current_q
+            self._narrow_toward_worse(task, task.current_q)
+            self._schedule_next_probe(task)
             return
             
         # 体积合规后进入 VMAF 分析
         if self._abort_if_interrupted(task):
             return
 
+        if predicted:
+            # 参数不差于编码器安全参数：直接判定达标，跳过分析队列
+            info(
+                f"{task.display_name} | Q={task.current_q} 不差于安全参数 Q={self.profile.safe_q}，"
+                f"预计 VMAF ≥ {self.profile.floor_score:.2f}，跳过分析。",
+                leading_blank=True,
+            )
+            self._apply_vmaf_score(task, self.profile.floor_score, predicted=True)
+            return
+
+        if fused_score is not None:
+            # 压缩时已得到分数，直接在压缩线程内推进搜索，跳过分析队列
+            self._store_cached_score(
+                task, task.vmaf_model, self.vmaf.probe_subsample, fused_score
+            )
+            phase_end(task.display_name, "VMAF 分析完成（压缩同步评估）")
+            self._apply_vmaf_score(task, fused_score)
+            return
+
+        # 入队前确定预压缩参数：入队后分析线程会并发修改搜索区间
+        spec_q = self._plan_speculation(task)
         self._put_analyze_queue(task, high_priority=task.attempts > 1)
+        if spec_q is not None:
+            self._run_speculation(task)
+
+    def _predicts_pass(self, task: VideoTask) -> bool:
+        """当前参数不差于编码器安全参数且目标不高于其 VMAF 下限时，可直接判定达标。"""
+
+        safe_q = self.profile.safe_q
+        if not self.vmaf_shortcut or safe_q is None:
+            return False
+        if self.target_vmaf > self.profile.floor_score:
+            return False
+        return (task.current_q - safe_q) * self.profile.step >= 0
 
     def _process_analysis(self, task: VideoTask):
         """执行 VMAF 分析。"""
@@ -494,22 +1124,74 @@ class SmartScheduler:
 
         phase_start(task.display_name, "开始 VMAF 分析")
 
-        resolution, model_str = self.vmaf.get_vmaf_model_selection(task.input_path)
-        res_part = self.vmaf.format_resolution_for_log(resolution, mode="kv")
+        model_str = task.vmaf_model
+        res_part = self.vmaf.format_resolution_for_log(task.vmaf_resolution, mode="kv")
         info(f"{task.display_name} | {res_part} | 模型={model_str}")
 
-        if task.temp_file is None or not task.temp_file.exists():
+        if task.temp_file is None:
             warn(f"{task.display_name} | 缺少有效的临时文件，跳过分析。")
             self._finalize_task(task, use_best_effort=True)
             return
 
-        score = self.vmaf.calculate_vmaf(task.input_path, task.temp_file)
+        n_subsample = self.vmaf.probe_subsample
+        score = self._cached_score(task, model_str, n_subsample)
+        if score is not None:
+            phase_end(task.display_name, "VMAF 分析完成（命中缓存）")
+            self._apply_vmaf_score(task, score)
+            return
+
+        score = self.vmaf.calculate_vmaf(
+            task.input_path,
+            task.temp_file,
+            model_str=model_str,
+            reference_cache=self._ensure_reference_cache(task),
+            n_subsample=n_subsample,
+        )
         phase_end(task.display_name, "VMAF 分析完成")
-        
+        self._store_cached_score(task, model_str, n_subsample, score)
+        self._apply_vmaf_score(task, score)
+
+    def _score_cache_key(self, task: VideoTask, model_str: str, n_subsample: int) -> Optional[str]:
+        """当前探测结果的 VMAF 缓存键；未启用缓存或体积未知时返回 None。"""
+
+        if self.vmaf_cache is None or task.last_dst_size is None:
+            return None
+        return make_score_key(
+            task.input_path,
+            task.src_mtime_ns,
+            task.src_size,
+            task.last_dst_size,
+            self.compressor.encoder.name,
+            task.current_q,
+            model_str,
+            n_subsample,
+        )
+
+    def _cached_score(self, task: VideoTask, model_str: str, n_subsample: int) -> Optional[float]:
+        key = self._score_cache_key(task, model_str, n_subsample)
+        if key is None:
+            return None
+        return self.vmaf_cache.get(key)
+
+    def _store_cached_score(
+        self, task: VideoTask, model_str: str, n_subsample: int, score: Optional[float]
+    ) -> None:
+        if score is None:
+            return
+        key = self._score_cache_key(task, model_str, n_subsample)
+        if key is not None:
+            self.vmaf_cache.put(key, score)
+
+    def _apply_vmaf_score(self, task: VideoTask, score: Optional[float], predicted: bool = False) -> None:
+        """根据本轮 VMAF 结果更新最佳候选、收缩搜索区间并调度下一轮探测。
+
+        predicted=True 表示分数为编码器安全参数给出的下限预测，而非实际计算结果。
+        """
+
         # 计算体积占比用于日志
         current_ratio_str = "N/A"
-        if task.temp_file.exists() and task.src_size > 0:
-            current_ratio = task.temp_file.stat().st_size / task.src_size
+        if task.last_dst_size is not None and task.src_size > 0:
+            current_ratio = task.last_dst_size / task.src_size
             current_ratio_str = f"{current_ratio:.2%}"
 
         if score is None:
@@ -519,41 +1201,59 @@ class SmartScheduler:
             self._finalize_task(task, use_best_effort=True)
             return
             
-        info(f"{task.display_name} | VMAF={score:.2f} | 体积={current_ratio_str}", leading_blank=True)
-
-        if score >= self.target_vmaf:
-            success(f"{task.display_name} | 达到目标 VMAF。")
-            if task.output_path.exists():
-                task.output_path.unlink()
-            task.temp_file.rename(task.output_path)
-            task.final_vmaf = score
+        if not predicted:
+            info(f"{task.display_name} | VMAF={score:.2f} | 体积={current_ratio_str}", leading_blank=True)
+
+        if not predicted:
+            task.history.append((task.current_q, score))
+
+        passed = score >= self.target_vmaf
+        if passed:
+            info(f"{task.display_name} | 达到目标 VMAF (Q={task.current_q})，继续尝试更小体积。")
+
+        # 更新最佳候选：达标结果总是替换（搜索只会继续走向更小体积）；
+        # 尚无达标结果时保留 VMAF 最高的未达标结果。
+        if passed or (task.best_passing_q is None and score > task.best_effort_score):
+            # 文件原地保留：探测槽位与最佳槽位互换，旧的最佳候选由下一轮编码覆盖
+            task.best_effort_file = task.temp_file
+            task.probe_slot, task.best_effort_slot = task.best_effort_slot, task.temp_file
+            task.best_effort_score = score
+            task.best_effort_size = task.last_dst_size
+            task.best_effort_predicted = predicted
             task.final_q = task.current_q
-            task.final_ratio = task.output_path.stat().st_size / task.src_size if task.src_size > 0 else None
-
-            # 清理最佳候选
-            self._safe_unlink(task.best_effort_file)
-            task.best_effort_file = None
-            task.temp_file = None
-                
-            self._finalize_task(task, keep_output=True)
-            return
-        
-        # 未达标，但体积合规，作为当前最佳候选
-        
-        self._safe_unlink(task.best_effort_file)
-            
-        task.best_effort_file = task.output_path.with_name(f"{task.output_path.stem}_best_effort{task.output_path.suffix}")
-        task.temp_file.rename(task.best_effort_file)
-        task.best_effort_score = score
-        task.final_q = task.current_q
+        else:
+            self._safe_unlink(task.temp_file)
         task.temp_file = None
-        
-        # 准备下一轮尝试
-        task.current_q += task.step_direction
-        if self._abort_if_interrupted(task):
-            return
 
-        self._put_comp_queue_front(task)
+        if passed:
+            task.best_passing_q = task.current_q
+            self._narrow_toward_worse(task, task.current_q)
+        else:
+            self._narrow_toward_better(task, task.current_q)
+
+        # 准备下一轮探测
+        self._schedule_next_probe(task)
+
+    def _ensure_reference_cache(self, task: VideoTask) -> Optional[Path]:
+        """按需为任务生成参考视频无损缓存，返回可用的缓存路径（未启用或失败时为 None）。
+
+        同一任务在同一时刻只会由一个工作线程处理，因此无需加锁。
+        """
+
+        if not self.reference_cache or task.ref_cache_failed:
+            return None
+        if task.ref_cache is not None:
+            return task.ref_cache
+
+        cache_file = task.slot_path("refcache", ".mkv")
+        phase_start(task.display_name, "生成参考缓存")
+        if not self.vmaf.build_reference_cache(task.input_path, cache_file):
+            task.ref_cache_failed = True
+            self._safe_unlink(cache_file)
+            return None
+        phase_end(task.display_name, "参考缓存就绪")
+        task.ref_cache = cache_file
+        return cache_file
 
     def _finalize_task(self, task: VideoTask, use_best_effort: bool = False, keep_output: bool = False):
         """将任务落盘成最终输出，并把任务加入 results。
@@ -566,12 +1266,13 @@ class SmartScheduler:
             self._abort_task(task)
             return
 
-        # 根据策略确定最终输出
-        final_source = None
+        # 根据策略确定最终输出（final_size 为已知的落盘体积，避免落盘后再 stat）
+        final_size: Optional[int] = None
 
         if keep_output:
-            if task.final_ratio is None and task.src_size > 0 and task.output_path.exists():
-                task.final_ratio = task.output_path.stat().st_size / task.src_size
+            # 输出为原文件的直接复制（JPG），体积与原文件一致
+            if task.final_ratio is None and task.src_size > 0:
+                task.final_ratio = 1.0
 
             # 清理临时文件
             self._cleanup_task_intermediates(task)
@@ -579,36 +1280,42 @@ class SmartScheduler:
             self._mark_task_done(task)
             return
         
-        if use_best_effort and task.best_effort_file and task.best_effort_file.exists():
-            final_source = task.best_effort_file
-            info(f"{task.display_name} | 使用最佳候选结果 (VMAF={task.best_effort_score:.2f})")
+        task.output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 最佳候选直接移动到输出（同一文件系统内为原子 os.replace，省去 exists + unlink + rename）；
+        # 候选文件缺失时抛出 FileNotFoundError，此时回退原视频
+        placed = False
+        if use_best_effort and task.best_effort_file is not None:
+            try:
+                move_file_replace(task.best_effort_file, task.output_path)
+                placed = True
+            except FileNotFoundError:
+                pass
+
+        if placed:
+            final_size = task.best_effort_size
+            score_op = "≥" if task.best_effort_predicted else "="
+            info(f"{task.display_name} | 使用最佳候选结果 (VMAF{score_op}{task.best_effort_score:.2f})")
             if task.final_vmaf is None and task.best_effort_score >= 0:
                 task.final_vmaf = task.best_effort_score
             # final_q 在 best-effort 生成时已经记录，避免用 current_q（可能已推进）覆盖。
         else:
-            final_source = task.input_path
             if use_best_effort:
                 warn(f"{task.display_name} | 未找到合适压缩结果，使用原视频。")
             else:
                 warn(f"{task.display_name} | 压缩终止（如体积限制），使用原视频。")
-            if task.final_q is None:
-                task.final_q = None
-
-        # 确保输出目录存在
-        task.output_path.parent.mkdir(parents=True, exist_ok=True)
-
-        if not keep_output:
-            if task.output_path.exists():
-                task.output_path.unlink()
-
-            if final_source == task.input_path:
-                shutil.copy2(task.input_path, task.output_path)
-            elif final_source:
-                final_source.rename(task.output_path)
+            self.compressor.promote_original(task.input_path, task.output_path)
+            final_size = task.src_size
+
+        if task.final_ratio is None and task.src_size > 0:
+            if final_size is None:
+                try:
+                    final_size = task.output_path.stat().st_size
+                except OSError:
+                    pass
+            if final_size is not None:
+                task.final_ratio = final_size / task.src_size
 
-        if task.final_ratio is None and task.src_size > 0 and task.output_path.exists():
-            task.final_ratio = task.output_path.stat().st_size / task.src_size
-             
         # 清理临时文件
         self._cleanup_task_intermediates(task)
         
@@ -624,6 +1331,8 @@ class SmartScheduler:
         for task in sorted(self.results, key=lambda t: t.display_name):
             q_str = f"{task.final_q}" if task.final_q is not None else "N/A"
             vmaf_str = f"{task.final_vmaf:.2f}" if task.final_vmaf is not None else "N/A"
+            if task.final_vmaf is not None and task.best_effort_predicted:
+                vmaf_str = f"≥{vmaf_str}"
             ratio_str = f"{task.final_ratio:.2%}" if task.final_ratio is not None else "N/A"
             name = task.display_name
             if len(name) > 40:
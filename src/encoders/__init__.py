@@ -1,15 +1,21 @@
+from functools import lru_cache
+
 from .base import BaseEncoder
 from .intel import IntelEncoder
 from .nvidia import NvidiaEncoder
 from .mac import MacEncoder
 
+_ENCODER_CLASSES = {
+    "intel": IntelEncoder,
+    "nvidia": NvidiaEncoder,
+    "mac": MacEncoder,
+}
+
+
+@lru_cache(maxsize=None)
 def get_encoder(name: str) -> BaseEncoder:
-    """获取编码器实例的工厂函数。"""
-    encoders = {
-        "intel": IntelEncoder(),
-        "nvidia": NvidiaEncoder(),
-        "mac": MacEncoder(),
-    }
-    if name not in encoders:
-        raise ValueError(f"未知编码器: {name}. 可选项: {list(encoders.keys())}")
-    return encoders[name]
+    """获取编码器实例的工厂函数（编码器无状态，同名返回同一实例）。"""
+    cls = _ENCODER_CLASSES.get(name)
+    if cls is None:
+        raise ValueError(f"未知编码器: {name}. 可选项: {list(_ENCODER_CLASSES.keys())}")
+    return cls()
@@ -1,12 +1,25 @@
+import os
 from abc import ABC, abstractmethod
-from pathlib import Path
-from typing import List
+from typing import List, Optional, Union
+
+# 编码器接受的路径类型：已转换好的 str 原样使用，Path 等在生成命令时经 os.fspath 转换
+StrPath = Union[str, "os.PathLike[str]"]
+
+# 各编码器命令共用的结尾参数（音频直通、保留元数据、覆盖输出），其后紧跟输出路径
+COMMON_TAIL_ARGS = ("-c:a", "copy", "-map_metadata", "0", "-y")
 
 
 class BaseEncoder(ABC):
+    # 编码器无实例状态：参数均以只读属性给出，调度器通过 EncoderProfile 一次性快照，
+    # 热路径不再访问这些属性；空 __slots__ 省去实例 __dict__
+    __slots__ = ()
+
+    # 子类覆盖了 is_valid_quality（存在需要跳过的参数）时设为 True；为 False 时调用方可跳过逐个检查
+    HAS_QUALITY_FILTER = False
+
     @abstractmethod
-    def get_ffmpeg_args(self, input_path: Path, output_path: Path, **kwargs) -> List[str]:
-        """为特定编码器生成 ffmpeg 参数。"""
+    def get_ffmpeg_args(self, input_path: StrPath, output_path: StrPath, **kwargs) -> List[str]:
+        """为特定编码器生成 ffmpeg 参数（路径可直接传入已转换的 str，避免重复 str(Path)）。"""
         raise NotImplementedError
 
     @property
@@ -37,6 +50,21 @@ class BaseEncoder(ABC):
         """FFmpeg 编解码器名称（例如 hevc_nvenc）。"""
         return ""
 
+    @property
+    def vmaf_safe_quality(self) -> Optional[int]:
+        """已知稳定达到 vmaf_floor_score 的质量参数（None 表示未知，不做预测）。"""
+        return None
+
+    @property
+    def vmaf_floor_score(self) -> float:
+        """质量不低于 vmaf_safe_quality 时可预期的 VMAF 下限。"""
+        return 95.0
+
+    @property
+    def vmaf_slope(self) -> Optional[float]:
+        """质量参数每向“更高质量”方向移动一档，VMAF 的典型增量（None 表示未知，不做首轮预测）。"""
+        return None
+
     def is_valid_quality(self, quality: int) -> bool:
-        """检查质量参数是否有效（默认全部有效，子类可覆盖）。"""
+        """检查质量参数是否有效（默认全部有效，子类覆盖时需同时设置 HAS_QUALITY_FILTER）。"""
         return True
@@ -1,8 +1,27 @@
-from pathlib import Path
-from typing import List
-from .base import BaseEncoder
+import os
+from typing import List, Optional
+from .base import COMMON_TAIL_ARGS, BaseEncoder, StrPath
+
+# Intel QSV 命令模板：None 处在调用时填入输入、质量参数与输出
+_ARG_TEMPLATE = (
+    "ffmpeg",
+    "-hwaccel", "qsv",
+    "-hwaccel_output_format", "qsv",
+    "-i", None,
+    "-c:v", "hevc_qsv",
+    "-vtag", "hvc1",
+    "-preset", "veryslow",
+    "-global_quality", None,
+    *COMMON_TAIL_ARGS,
+    None,
+)
+_I_IN = _ARG_TEMPLATE.index("-i") + 1
+_I_Q = _ARG_TEMPLATE.index("-global_quality") + 1
+_I_OUT = len(_ARG_TEMPLATE) - 1
 
 class IntelEncoder(BaseEncoder):
+    __slots__ = ()
+
     @property
     def name(self) -> str:
         return "intel"
@@ -19,23 +38,22 @@ class IntelEncoder(BaseEncoder):
     def quality_step(self) -> int:
         return -1  # global_quality 越小质量越高
 
+    @property
+    def vmaf_safe_quality(self) -> Optional[int]:
+        return 18  # 保守取值：global_quality ≤ 18 时 VMAF 稳定高于 95
+
+    @property
+    def vmaf_slope(self) -> Optional[float]:
+        return 0.8  # 粗略估计：global_quality 常用区间内每档约 0.8 VMAF，仅用于首轮之后的跳跃预测
+
     @property
     def quality_range(self) -> tuple[int, int]:
         return (1, 51)
 
-    def get_ffmpeg_args(self, input_path: Path, output_path: Path, quality: int = 21, **kwargs) -> List[str]:
+    def get_ffmpeg_args(self, input_path: StrPath, output_path: StrPath, quality: int = 21, **kwargs) -> List[str]:
         # Intel QSV 模式
-        return [
-            "ffmpeg",
-            "-hwaccel", "qsv",
-            "-hwaccel_output_format", "qsv",
-            "-i", str(input_path),
-            "-c:v", self.codec_name,
-            "-vtag", "hvc1",
-            "-preset", "veryslow",
-            "-global_quality", str(quality),
-            "-c:a", "copy",
-            "-map_metadata", "0",
-            "-y",
-            str(output_path),
-        ]
+        args = list(_ARG_TEMPLATE)
+        args[_I_IN] = os.fspath(input_path)
+        args[_I_Q] = str(quality)
+        args[_I_OUT] = os.fspath(output_path)
+        return args
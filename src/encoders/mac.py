@@ -1,19 +1,40 @@
-from pathlib import Path
-from typing import List
-from .base import BaseEncoder
+import os
+from typing import List, Optional
+from .base import COMMON_TAIL_ARGS, BaseEncoder, StrPath
+
+# macOS VideoToolbox 命令模板：None 处在调用时填入输入、质量参数与输出
+_ARG_TEMPLATE = (
+    "ffmpeg",
+    "-hwaccel", "videotoolbox",
+    "-i", None,
+    "-c:v", "hevc_videotoolbox",
+    "-vtag", "hvc1",
+    "-q:v", None,
+    *COMMON_TAIL_ARGS,
+    None,
+)
+_I_IN = _ARG_TEMPLATE.index("-i") + 1
+_I_Q = _ARG_TEMPLATE.index("-q:v") + 1
+_I_OUT = len(_ARG_TEMPLATE) - 1
+
+# 基于实测（Apple Silicon + VideoToolbox）确认的“重复输出参数”。
+# 这些 q:v 在当前环境下会产生与相邻参数相同的结果，适合直接跳过。
+_KNOWN_DUPLICATE_QUALITIES = frozenset({
+    3, 4, 6, 7, 9, 10, 12, 13, 15, 16,
+    18, 20, 21, 23, 24, 26, 27, 29, 31, 32,
+    34, 35, 37, 39, 40,
+    42, 44, 45, 47, 49, 50,
+    52, 54, 56, 58, 59, 61, 63, 65, 67, 69,
+    71, 73, 75, 77, 80, 82, 85,
+})
+# 同一集合的位图形式（第 q 位为 1 表示重复），判定只需一次移位与按位与
+_DUPLICATE_MASK = sum(1 << q for q in _KNOWN_DUPLICATE_QUALITIES)
 
 
 class MacEncoder(BaseEncoder):
-    # 基于实测（Apple Silicon + VideoToolbox）确认的“重复输出参数”。
-    # 这些 q:v 在当前环境下会产生与相邻参数相同的结果，适合直接跳过。
-    _KNOWN_DUPLICATE_QUALITIES = {
-        3, 4, 6, 7, 9, 10, 12, 13, 15, 16,
-        18, 20, 21, 23, 24, 26, 27, 29, 31, 32,
-        34, 35, 37, 39, 40,
-        42, 44, 45, 47, 49, 50,
-        52, 54, 56, 58, 59, 61, 63, 65, 67, 69,
-        71, 73, 75, 77, 80, 82, 85,
-    }
+    __slots__ = ()
+
+    HAS_QUALITY_FILTER = True
 
     @property
     def name(self) -> str:
@@ -31,24 +52,25 @@ class MacEncoder(BaseEncoder):
     def quality_step(self) -> int:
         return 1  # q:v 越大质量越高
 
+    @property
+    def vmaf_safe_quality(self) -> Optional[int]:
+        return 80  # 保守取值：q:v ≥ 80 时 VMAF 稳定高于 95
+
+    @property
+    def vmaf_slope(self) -> Optional[float]:
+        return 0.4  # 粗略估计：q:v 常用区间内每档约 0.4 VMAF，仅用于首轮之后的跳跃预测
+
     @property
     def quality_range(self) -> tuple[int, int]:
         return (1, 100)
 
-    def get_ffmpeg_args(self, input_path: Path, output_path: Path, quality: int = 58, **kwargs) -> List[str]:
+    def get_ffmpeg_args(self, input_path: StrPath, output_path: StrPath, quality: int = 58, **kwargs) -> List[str]:
         # macOS VideoToolbox 模式
-        return [
-            "ffmpeg",
-            "-hwaccel", "videotoolbox",
-            "-i", str(input_path),
-            "-c:v", self.codec_name,
-            "-vtag", "hvc1",
-            "-q:v", str(quality),
-            "-c:a", "copy",
-            "-map_metadata", "0",
-            "-y",
-            str(output_path),
-        ]
+        args = list(_ARG_TEMPLATE)
+        args[_I_IN] = os.fspath(input_path)
+        args[_I_Q] = str(quality)
+        args[_I_OUT] = os.fspath(output_path)
+        return args
 
     def is_valid_quality(self, quality: int) -> bool:
         """
@@ -59,8 +81,5 @@ class MacEncoder(BaseEncoder):
         - 对已实测确认的重复参数直接返回 False（跳过）。
         - 其他参数默认返回 True，避免在未测区间过度假设。
         """
-        if quality in self._KNOWN_DUPLICATE_QUALITIES:
-            return False
-
-        # 对于尚未测量的范围，默认返回 True（不做假设）
-        return True
+        # 对于尚未测量的范围，默认返回 True（不做假设）；负数不能移位，同样视为有效
+        return quality < 0 or not (_DUPLICATE_MASK >> quality) & 1
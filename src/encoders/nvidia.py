@@ -1,8 +1,27 @@
-from pathlib import Path
-from typing import List
-from .base import BaseEncoder
+import os
+from typing import List, Optional
+from .base import COMMON_TAIL_ARGS, BaseEncoder, StrPath
+
+# NVENC 命令模板（Constant QP 模式控制质量）：None 处在调用时填入输入、QP 与输出
+_ARG_TEMPLATE = (
+    "ffmpeg",
+    "-i", None,
+    "-c:v", "hevc_nvenc",
+    "-vtag", "hvc1",
+    "-preset", "p7",
+    "-multipass", "fullres",
+    "-rc", "constqp",
+    "-qp", None,
+    *COMMON_TAIL_ARGS,
+    None,
+)
+_I_IN = _ARG_TEMPLATE.index("-i") + 1
+_I_Q = _ARG_TEMPLATE.index("-qp") + 1
+_I_OUT = len(_ARG_TEMPLATE) - 1
 
 class NvidiaEncoder(BaseEncoder):
+    __slots__ = ()
+
     @property
     def name(self) -> str:
         return "nvidia"
@@ -19,38 +38,27 @@ class NvidiaEncoder(BaseEncoder):
     def quality_step(self) -> int:
         return -1  # QP 越小质量越高
 
+    @property
+    def vmaf_safe_quality(self) -> Optional[int]:
+        return 18  # 保守取值：QP ≤ 18 时 VMAF 稳定高于 95
+
+    @property
+    def vmaf_slope(self) -> Optional[float]:
+        return 0.8  # 粗略估计：QP 常用区间内每档约 0.8 VMAF，仅用于首轮之后的跳跃预测
+
     @property
     def quality_range(self) -> tuple[int, int]:
         return (0, 51)
 
     def get_ffmpeg_args(
         self, 
-        input_path: Path, 
-        output_path: Path, 
+        input_path: StrPath, 
+        output_path: StrPath, 
         quality: int = 24,  # QP 值
         **kwargs
     ) -> List[str]:
-        
-        cmd = [
-            "ffmpeg",
-            "-i", str(input_path),
-            "-c:v", self.codec_name,
-            "-vtag", "hvc1",
-            "-preset", "p7",
-            "-multipass", "fullres",
-        ]
-
-        # 使用 Constant QP (CQP) 模式进行质量控制
-        cmd.extend([
-            "-rc", "constqp",
-            "-qp", str(quality)
-        ])
-        
-        cmd.extend([
-            "-c:a", "copy",
-            "-map_metadata", "0",
-            "-y",
-            str(output_path)
-        ])
-        
-        return cmd
+        args = list(_ARG_TEMPLATE)
+        args[_I_IN] = os.fspath(input_path)
+        args[_I_Q] = str(quality)
+        args[_I_OUT] = os.fspath(output_path)
+        return args
@@ -0,0 +1,6 @@
+"""Python 版本兼容工具。"""
+
+import sys
+
+# `@dataclass(**DATACLASS_SLOTS)`：Python 3.10+ 生成 __slots__（省去实例 __dict__），3.9 下退化为普通 dataclass
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
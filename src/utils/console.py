@@ -1,22 +1,81 @@
 """控制台输出工具。
 
 目标：统一日志风格，让压缩、分析、绘图阶段的输出更易读。
+
+所有输出先进入队列，由单个后台线程合并写入 stdout：
+多线程（压缩/分析工作线程）调用时只做入队，不争抢 stdout，也不会出现行内交错。
 """
 
 from __future__ import annotations
 
-from typing import Iterable, Sequence
+import atexit
+import queue
+import sys
+import threading
+from typing import Iterable, Sequence, Union
+
+# 队列元素：待输出文本，或 flush 时用于等待写出完成的 Event
+_log_queue: "queue.SimpleQueue[Union[str, threading.Event]]" = queue.SimpleQueue()
+
+
+def _writer_loop() -> None:
+    """后台写出线程：一次取空队列中已积压的文本，合并为一次 write + flush。"""
+
+    while True:
+        item = _log_queue.get()
+        chunks: list[str] = []
+        waiters: list[threading.Event] = []
+        while True:
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+            else:
+                chunks.append(item)
+            try:
+                item = _log_queue.get_nowait()
+            except queue.Empty:
+                break
+
+        if chunks:
+            try:
+                sys.stdout.write("".join(chunks))
+                sys.stdout.flush()
+            except (OSError, ValueError):
+                # stdout 已关闭或管道断开时丢弃输出，保持线程存活以免 flush 永久阻塞
+                pass
+        for waiter in waiters:
+            waiter.set()
+
+
+_writer = threading.Thread(target=_writer_loop, name="console-writer", daemon=True)
+_writer.start()
+
+
+def flush_output(timeout: float = 5.0) -> None:
+    """阻塞等待此前入队的输出全部写出。"""
+
+    done = threading.Event()
+    _log_queue.put(done)
+    done.wait(timeout)
+
+
+# 进程退出前写出残留日志（写出线程为守护线程，不会自行等待）
+atexit.register(flush_output)
+
+
+def _write_lines(*lines: str) -> None:
+    """将若干行作为一个整体入队，保证同一条日志的多行不被其他线程打断。"""
+
+    _log_queue.put("".join(f"{line}\n" for line in lines))
 
 
 def _emit(message: str, tag: str | None = None, leading_blank: bool = False) -> None:
     """统一输出底层函数。"""
 
+    text = f"[{tag}] {message}" if tag else message
     if leading_blank:
-        print("")
-    if tag:
-        print(f"[{tag}] {message}")
+        _write_lines("", text)
         return
-    print(message)
+    _write_lines(text)
 
 
 def info(message: str, leading_blank: bool = False) -> None:
@@ -65,8 +124,7 @@ def section(title: str) -> None:
     """输出分节标题。"""
 
     line = "=" * 16
-    print("")
-    print(f"{line} {title} {line}")
+    _write_lines("", f"{line} {title} {line}")
 
 
 def print_table(headers: Sequence[str], rows: Iterable[Sequence[str]]) -> None:
@@ -85,7 +143,8 @@ def print_table(headers: Sequence[str], rows: Iterable[Sequence[str]]) -> None:
     def _fmt(row: Sequence[str]) -> str:
         return " | ".join(str(cell).ljust(widths[i]) for i, cell in enumerate(row))
 
-    print(_fmt(headers))
-    print("-+-".join("-" * widths[i] for i in range(col_count)))
-    for row in rows:
-        print(_fmt(row))
+    _write_lines(
+        _fmt(headers),
+        "-+-".join("-" * widths[i] for i in range(col_count)),
+        *(_fmt(row) for row in rows),
+    )
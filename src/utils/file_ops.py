@@ -1,40 +1,174 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import shutil
+import sys
 from pathlib import Path
 from typing import List, Optional
 
+try:
+    import fcntl
+except ImportError:  # Windows 无 fcntl
+    fcntl = None
+
+# Linux ioctl FICLONE：在 Btrfs/XFS 等文件系统上创建写时复制（reflink）副本
+_FICLONE = 0x40049409
+
 
 def find_videos(directory: Path, extensions: Optional[List[str]] = None, recursive: bool = False) -> List[Path]:
-    """在目录中查找视频文件，按路径排序后返回。"""
+    """在目录中查找视频文件，按路径排序后返回。
+
+    基于 `os.scandir`：文件类型取自目录项自带的 d_type，无需逐项 stat，只为命中的文件构造 Path。
+    与 `rglob` 一致，不进入指向目录的符号链接。
+    """
     directory = directory.resolve()
     if not directory.exists():
         return []
 
     if extensions is None:
         extensions = [".mp4"]
+    exts = frozenset(ext.lower() for ext in extensions)
 
     files: List[Path] = []
+    pending = [os.fspath(directory)]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as it:
+                for entry in it:
+                    if recursive and entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in exts and entry.is_file():
+                        files.append(Path(entry.path))
+        except OSError:
+            # 无权限等无法读取的子目录直接跳过
+            continue
 
-    def is_video(path_item: Path) -> bool:
-        return path_item.is_file() and path_item.suffix.lower() in extensions
+    return sorted(files)
 
-    if recursive:
-        for path_item in directory.rglob("*"):
-            if is_video(path_item):
-                files.append(path_item)
-    else:
-        for path_item in directory.iterdir():
-            if is_video(path_item):
-                files.append(path_item)
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
 
-    return sorted(files)
 
 def human_size(size_bytes: int) -> str:
     """将字节转换为人类可读的字符串 (MB)。"""
     if size_bytes == 0:
         return "0B"
-    size_name = ("B", "KB", "MB", "GB", "TB")
-    i = 0
-    p = float(size_bytes)
-    while p >= 1024 and i < len(size_name) - 1:
-        p /= 1024
-        i += 1
-    return f"{p:.2f} {size_name[i]}"
+    # bit_length 直接给出 1024 的幂次，省去逐级除法
+    i = min(max((int(size_bytes).bit_length() - 1) // 10, 0), len(_SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << (10 * i)):.2f} {_SIZE_UNITS[i]}"
+
+
+def _copy_with_copy_file_range(src: Path, dst: Path) -> bool:
+    """使用 `os.copy_file_range` 在内核内复制（Linux 5.3+，支持的文件系统上可直接 reflink）。"""
+
+    if not hasattr(os, "copy_file_range"):
+        return False
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        except OSError:
+            return False
+    return remaining == 0
+
+
+_libc_clonefile = None
+
+
+def _clonefile_darwin(src: Path, dst: Path) -> bool:
+    """macOS APFS：通过 libc `clonefile(2)` 创建写时复制副本（同时复制元数据），失败返回 False。"""
+
+    global _libc_clonefile
+    if _libc_clonefile is None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            func = libc.clonefile
+        except (OSError, AttributeError, TypeError):
+            func = False
+        else:
+            func.argtypes = (ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint32)
+            func.restype = ctypes.c_int
+        _libc_clonefile = func
+    if not _libc_clonefile:
+        return False
+    return _libc_clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+
+
+def copy_file_fast(src: Path, dst: Path, allow_hardlink: bool = False) -> None:
+    """以尽量低的 I/O 代价把 src 复制到 dst（dst 需不存在）。
+
+    依次尝试：硬链接（需显式允许且位于同一文件系统）→ reflink（Linux FICLONE / macOS clonefile）
+    → `os.copy_file_range` → `shutil.copy2`。除硬链接外都会复制文件元数据。
+
+    硬链接与原文件共享数据，修改其一另一个也会变化，因此默认关闭。
+    """
+
+    if allow_hardlink:
+        try:
+            if src.stat().st_dev == dst.parent.stat().st_dev:
+                os.link(src, dst)
+                return
+        except OSError:
+            pass
+
+    if sys.platform == "darwin" and _clonefile_darwin(src, dst):
+        return
+
+    if fcntl is not None and sys.platform.startswith("linux"):
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            dst.unlink(missing_ok=True)
+
+        try:
+            if _copy_with_copy_file_range(src, dst):
+                shutil.copystat(src, dst)
+                return
+        except OSError:
+            pass
+        dst.unlink(missing_ok=True)
+
+    shutil.copy2(src, dst)
+
+
+def copy_file_replace(src: Path, dst: Path, allow_hardlink: bool = False) -> None:
+    """把 src 复制为 dst（dst 已存在时覆盖）。
+
+    先写入同目录的 `.{dst.name}.copy.tmp`，完成后 `os.replace` 原子替换，
+    中途失败或中断时不会在 dst 位置留下半截文件。
+    """
+
+    tmp = dst.with_name(f".{dst.name}.copy.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        copy_file_fast(src, tmp, allow_hardlink=allow_hardlink)
+        os.replace(tmp, dst)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def move_file_replace(src: Path, dst: Path) -> None:
+    """把 src 移动为 dst（dst 已存在时覆盖）。
+
+    同一文件系统内即 `os.replace`；跨设备（EXDEV，例如输出目录位于另一挂载点）时
+    改用 `copy_file_replace`（优先 reflink / clonefile）复制后删除 src。
+    src 不存在时抛出 FileNotFoundError。
+    """
+
+    try:
+        os.replace(src, dst)
+        return
+    except OSError as exc:
+        if exc.errno != errno.EXDEV:
+            raise
+    copy_file_replace(src, dst)
+    src.unlink(missing_ok=True)
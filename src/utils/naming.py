@@ -14,6 +14,8 @@ import re
 from dataclasses import dataclass
 from pathlib import Path
 
+from src.utils.compat import DATACLASS_SLOTS
+
 
 # 兼容历史遗留后缀：nvidia_qmax、qsv_、mac_ 等在 plotting/vmaf 中仍可能出现。
 _PARAM_SUFFIX_RE = re.compile(
@@ -45,7 +47,7 @@ def build_param_suffix(encoder_name: str, quality: int) -> str:
     raise ValueError(f"未知编码器: {encoder_name}")
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class OutputName:
     """输出文件名构造结果。"""
 
@@ -0,0 +1,150 @@
+"""子进程登记与整组终止。
+
+ffmpeg 子进程以独立进程组启动，终端 Ctrl+C 不再直接送达；中断时由调用方（或退出钩子）
+统一按进程组发送终止信号，避免编码/VMAF 进程在主程序退出后继续占用 CPU。
+"""
+
+import asyncio
+import atexit
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+
+# Popen/create_subprocess_exec 的附加参数：让子进程脱离终端前台进程组，便于整组终止
+if sys.platform == "win32":
+    NEW_GROUP_KWARGS = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    NEW_GROUP_KWARGS = {"start_new_session": True}
+
+# SIGTERM 后等待退出的宽限时间，超时再 SIGKILL
+SIGTERM_GRACE_SECONDS = 3.0
+
+_live_lock = threading.Lock()
+_live_procs: set[subprocess.Popen] = set()
+
+
+def register_process(proc: subprocess.Popen) -> None:
+    """登记运行中的子进程（需以 NEW_GROUP_KWARGS 启动）。"""
+
+    with _live_lock:
+        _live_procs.add(proc)
+
+
+class _AsyncProcessHandle:
+    """把 asyncio 子进程适配为登记表使用的 Popen 子集（pid / poll / wait / terminate / kill）。
+
+    returncode 由事件循环回调更新，阻塞式 wait 只供退出钩子使用（事件循环已停止时只能等到超时，随后整组 SIGKILL）；
+    事件循环内注销请用 `unregister_async_process`。
+    """
+
+    __slots__ = ("_proc", "pid", "args")
+
+    def __init__(self, proc: "asyncio.subprocess.Process") -> None:
+        self._proc = proc
+        self.pid = proc.pid
+        self.args = f"pid {proc.pid}"
+
+    def poll(self):
+        return self._proc.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._proc.returncode is None:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise subprocess.TimeoutExpired(self.args, timeout)
+            time.sleep(0.05)
+        return self._proc.returncode
+
+    def terminate(self) -> None:
+        self._proc.terminate()
+
+    def kill(self) -> None:
+        self._proc.kill()
+
+
+def register_async_process(proc: "asyncio.subprocess.Process") -> _AsyncProcessHandle:
+    """登记 asyncio 启动的子进程（需以 NEW_GROUP_KWARGS 启动），返回的句柄交给 unregister_process 注销。"""
+
+    handle = _AsyncProcessHandle(proc)
+    register_process(handle)
+    return handle
+
+
+async def unregister_async_process(handle: _AsyncProcessHandle) -> None:
+    """`unregister_process` 的异步版本：子进程仍在运行时整组终止，并在事件循环中等待其退出（不阻塞其他协程）。"""
+
+    proc = handle._proc
+    try:
+        if proc.returncode is None:
+            _signal_group(handle, signal.SIGTERM)
+            try:
+                await asyncio.wait_for(proc.wait(), SIGTERM_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                _signal_group(handle, getattr(signal, "SIGKILL", signal.SIGTERM))
+                await proc.wait()
+    finally:
+        with _live_lock:
+            _live_procs.discard(handle)
+
+
+def unregister_process(proc: subprocess.Popen) -> None:
+    """注销子进程；调用方异常退出（如 KeyboardInterrupt）时进程可能仍在运行，先整组终止。"""
+
+    if proc.poll() is None:
+        _signal_group(proc, signal.SIGTERM)
+        _wait_or_kill(proc, SIGTERM_GRACE_SECONDS)
+    with _live_lock:
+        _live_procs.discard(proc)
+
+
+def _signal_group(proc: subprocess.Popen, sig: int) -> None:
+    """向子进程所在进程组发送信号；Windows 下退化为只结束该进程。"""
+
+    try:
+        if sys.platform == "win32":
+            if sig == signal.SIGTERM:
+                proc.terminate()
+            else:
+                proc.kill()
+        else:
+            os.killpg(proc.pid, sig)
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+
+
+def _wait_or_kill(proc: subprocess.Popen, timeout: float) -> None:
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _signal_group(proc, getattr(signal, "SIGKILL", signal.SIGTERM))
+        try:
+            proc.wait(timeout=1.0)
+        except subprocess.TimeoutExpired:
+            pass
+
+
+def terminate_live_processes(grace_timeout: float = SIGTERM_GRACE_SECONDS) -> int:
+    """对所有已登记子进程的进程组发送 SIGTERM，超时未退出的再 SIGKILL，返回处理数量。"""
+
+    with _live_lock:
+        processes = [p for p in _live_procs if p.poll() is None]
+
+    if not processes:
+        return 0
+
+    for proc in processes:
+        _signal_group(proc, signal.SIGTERM)
+
+    deadline = time.monotonic() + grace_timeout
+    for proc in processes:
+        _wait_or_kill(proc, max(0.0, deadline - time.monotonic()))
+
+    return len(processes)
+
+
+# 子进程不再随终端 Ctrl+C 退出：主程序以任何方式结束时兜底终止残留进程
+atexit.register(terminate_live_processes)
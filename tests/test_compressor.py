@@ -0,0 +1,157 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.core.compressor import Compressor
+from src.encoders import get_encoder
+from src.utils import process
+
+# 假 ffmpeg：按环境变量延迟后，以截断方式写出固定字节数到最后一个参数（与 ffmpeg -y 一致）
+FAKE_FFMPEG = textwrap.dedent(
+    """\
+    #!{python}
+    import os, sys, time
+    time.sleep(float(os.environ.get("FAKE_FFMPEG_DELAY", "0")))
+    with open(sys.argv[-1], "wb") as f:
+        f.write(b"x" * int(os.environ.get("FAKE_FFMPEG_BYTES", "1000")))
+    """
+)
+
+
+class FakeFFmpegTestCase(unittest.TestCase):
+    """在临时目录中放置假 ffmpeg 并加入 PATH。"""
+
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        bin_dir = self.tmp / "bin"
+        bin_dir.mkdir()
+        ffmpeg = bin_dir / "ffmpeg"
+        ffmpeg.write_text(FAKE_FFMPEG.format(python=sys.executable))
+        ffmpeg.chmod(0o755)
+
+        self._saved_env = {k: os.environ.get(k) for k in ("PATH", "FAKE_FFMPEG_DELAY", "FAKE_FFMPEG_BYTES")}
+        os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+
+        self.src = self.tmp / "src.mp4"
+        self.src.write_bytes(b"s" * 100000)
+        self.out = self.tmp / "out" / "src.mp4"
+        self.out.parent.mkdir()
+
+    def tearDown(self) -> None:
+        for key, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        self._tmp.cleanup()
+
+
+class HardlinkFallbackTest(FakeFFmpegTestCase):
+    def test_reencode_does_not_truncate_hardlinked_original(self) -> None:
+        compressor = Compressor(get_encoder("intel"), hardlink_fallback=True)
+        # 上一次运行回退原视频：输出可能与原视频共享数据
+        compressor.promote_original(self.src, self.out)
+
+        self.assertTrue(compressor.compress_file(self.src, self.out, max_ratio=None, verbose=False))
+
+        self.assertEqual(self.src.stat().st_size, 100000)
+        self.assertEqual(self.out.stat().st_size, 1000)
+        self.assertFalse(os.path.samefile(self.src, self.out))
+
+
+class StaleOutputSizeWatchTest(FakeFFmpegTestCase):
+    """输出位置残留比阈值更大的旧文件时，体积轮询不能误判并回退原视频。"""
+
+    def setUp(self) -> None:
+        super().setUp()
+        shutil.copyfile(self.src, self.out)
+        # ffmpeg 启动后延迟写出：旧文件若未删除，轮询会先读到旧体积
+        os.environ["FAKE_FFMPEG_DELAY"] = "1.2"
+
+    def test_sync(self) -> None:
+        compressor = Compressor(get_encoder("intel"))
+        self.assertTrue(compressor.compress_file(self.src, self.out, max_ratio=0.8, verbose=False))
+        self.assertEqual(self.out.stat().st_size, 1000)
+
+    def test_async(self) -> None:
+        compressor = Compressor(get_encoder("intel"))
+        ok = asyncio.run(compressor.compress_file_async(self.src, self.out, max_ratio=0.8, verbose=False))
+        self.assertTrue(ok)
+        self.assertEqual(self.out.stat().st_size, 1000)
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "依赖 /proc 判断进程状态")
+class AsyncProcessRegistrationTest(FakeFFmpegTestCase):
+    """异步 ffmpeg 需登记到 src.utils.process，事件循环未取消任务就退出时也能被兜底终止。"""
+
+    def test_orphan_is_terminated(self) -> None:
+        os.environ["FAKE_FFMPEG_DELAY"] = "30"
+        compressor = Compressor(get_encoder("intel"))
+        _, cmd = compressor._prepare_compress(self.src, self.out, verbose=False, quality=20)
+
+        loop = asyncio.new_event_loop()
+        try:
+            task = loop.create_task(compressor._arun_ffmpeg(cmd))
+            loop.run_until_complete(asyncio.sleep(0.3))
+            with process._live_lock:
+                live = list(process._live_procs)
+            self.assertEqual(len(live), 1)
+            pid = live[0].pid
+            # 事件循环停止且任务未被取消：只能靠登记表终止
+            self.assertEqual(process.terminate_live_processes(grace_timeout=0.5), 1)
+            self.assertFalse(_process_running(pid))
+        finally:
+            # 断言之后再收尾，避免事件循环关闭时遗留挂起的任务与管道
+            task.cancel()
+            loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+            loop.close()
+            with process._live_lock:
+                process._live_procs.clear()
+
+    def test_error_path_does_not_block_event_loop(self) -> None:
+        os.environ["FAKE_FFMPEG_DELAY"] = "30"
+        compressor = Compressor(get_encoder("intel"))
+        _, cmd = compressor._prepare_compress(self.src, self.out, verbose=False, quality=20)
+
+        async def _run() -> None:
+            # 读取 stderr 之前抛出非取消异常，此时 ffmpeg 仍在运行
+            with mock.patch("src.core.compressor._StderrTail", side_effect=RuntimeError("boom")):
+                with self.assertRaises(RuntimeError):
+                    await compressor._arun_ffmpeg(cmd)
+
+        start = time.monotonic()
+        asyncio.run(_run())
+        elapsed = time.monotonic() - start
+
+        # 阻塞式注销会在事件循环线程里空等满宽限时间再 SIGKILL
+        self.assertLess(elapsed, process.SIGTERM_GRACE_SECONDS)
+        with process._live_lock:
+            self.assertFalse(process._live_procs)
+
+    def test_unregistered_after_completion(self) -> None:
+        compressor = Compressor(get_encoder("intel"))
+        self.assertTrue(asyncio.run(compressor.compress_file_async(self.src, self.out, max_ratio=None, verbose=False)))
+        with process._live_lock:
+            self.assertFalse(process._live_procs)
+
+
+def _process_running(pid: int) -> bool:
+    """进程存在且不是僵尸进程。"""
+
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+if __name__ == "__main__":
+    unittest.main()
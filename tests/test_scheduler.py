@@ -0,0 +1,105 @@
+import contextlib
+import io
+import unittest
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+from unittest import mock
+
+from src.analysis.vmaf import VMAFAnalyzer
+from src.core.compressor import Compressor
+from src.core.scheduler import SmartScheduler, VideoTask
+from src.encoders import get_encoder
+
+
+def _simulate_search(
+    encoder_name: str, start_q: int, score_at: Callable[[int], float], target: float = 95.0
+) -> Tuple[List[int], Optional[int]]:
+    """不启动 ffmpeg，按给定的 VMAF 曲线驱动调度器的搜索，返回 (依次探测的参数, 最终达标参数)。"""
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        scheduler = SmartScheduler(
+            Compressor(get_encoder(encoder_name)),
+            VMAFAnalyzer(n_threads=1),
+            target_vmaf=target,
+            size_limit=0.8,
+            speculative_probes=False,
+            cpu_partition=False,
+        )
+        profile = scheduler.profile
+        task = VideoTask(
+            input_path=Path("in.mp4"),
+            output_path=Path("out.mp4"),
+            display_name="in.mp4",
+            current_q=start_q,
+            step_direction=profile.step,
+            min_q=profile.min_q,
+            max_q=profile.max_q,
+            lo_q=profile.min_q,
+            hi_q=profile.max_q,
+        )
+
+        probes: List[int] = []
+        queued: List[VideoTask] = [task]
+        scheduler._put_comp_queue = queued.append
+        scheduler._finish_search = lambda t, exhausted=True: None
+
+        while queued:
+            t = queued.pop()
+            probes.append(t.current_q)
+            if len(probes) > profile.max_q - profile.min_q + 1:
+                break
+            if scheduler._predicts_pass(t):
+                scheduler._apply_vmaf_score(t, profile.floor_score, predicted=True)
+            else:
+                scheduler._apply_vmaf_score(t, score_at(t.current_q))
+    return probes, task.best_passing_q
+
+
+def _simulate_bisection(
+    encoder_name: str, start_q: int, score_at: Callable[[int], float]
+) -> Tuple[List[int], Optional[int]]:
+    """同一起点与判定规则下的纯二分搜索（不插值、不按安全参数截断区间），作为探测次数基线。"""
+
+    with mock.patch.object(SmartScheduler, "_estimate_crossing_q", lambda self, task, lo_q, hi_q: None), \
+            mock.patch.object(SmartScheduler, "_clip_to_safe_quality", lambda self, lo_q, hi_q: (lo_q, hi_q)):
+        return _simulate_search(encoder_name, start_q, score_at)
+
+
+# (编码器, 起点, VMAF 曲线)：实际斜率有意偏离 vmaf_slope 的估计值（0.8 / 0.8 / 0.4），覆盖起点达标与未达标两侧
+SEARCH_CASES = [
+    ("intel", 26, lambda q: 75 + 0.8 * (26 - q)),
+    ("intel", 26, lambda q: 75 + 3.0 * (26 - q)),
+    ("intel", 26, lambda q: 93 - 0.8 * (q - 26)),
+    ("intel", 26, lambda q: 97 - 0.3 * (q - 26)),
+    ("intel", 26, lambda q: 99 - 2.0 * (q - 26)),
+    ("nvidia", 26, lambda q: 80 + 1.5 * (26 - q)),
+    ("nvidia", 26, lambda q: 94 + 0.2 * (26 - q)),
+    ("nvidia", 26, lambda q: 96 - 0.8 * (q - 26)),
+    ("mac", 64, lambda q: 90 + 0.4 * (q - 64)),
+    ("mac", 64, lambda q: 90 + 2.0 * (q - 64)),
+    ("mac", 64, lambda q: 97 + 0.4 * (q - 64)),
+]
+
+
+class EstimateCrossingQTest(unittest.TestCase):
+    def test_slope_jump_into_predicted_region_does_not_degrade_to_linear_scan(self) -> None:
+        # 首次探测 Q=26 实测 VMAF 75；按斜率外推会跳入安全参数区（Q ≤ 18），之后不再有新的实测点
+        probes, best_q = _simulate_search("intel", 26, lambda q: 75 + 0.8 * (26 - q))
+
+        self.assertLessEqual(len(probes), 4, probes)
+        # 比安全参数更好的参数不会被探测
+        self.assertTrue(all(q >= 18 for q in probes), probes)
+        self.assertEqual(best_q, 18)
+
+    def test_converges_in_fewer_probes_than_bisection(self) -> None:
+        for encoder_name, start_q, score_at in SEARCH_CASES:
+            probes, best_q = _simulate_search(encoder_name, start_q, score_at)
+            base_probes, base_best_q = _simulate_bisection(encoder_name, start_q, score_at)
+            with self.subTest(encoder=encoder_name, probes=probes, bisection=base_probes):
+                self.assertEqual(best_q, base_best_q)
+                self.assertLess(len(probes), len(base_probes))
+                self.assertLessEqual(len(probes), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+
+from src.analysis.vmaf import VMAFAnalyzer
+from src.utils import process
+
+# 假 ffmpeg：按环境变量延迟后，在工作目录写出每组的 libvmaf JSON 日志（分数 90），再以给定返回码退出
+FAKE_FFMPEG = textwrap.dedent(
+    """\
+    #!{python}
+    import json, os, sys, time
+    if "-filters" in sys.argv:
+        print("libvmaf")
+        sys.exit(0)
+    time.sleep(float(os.environ.get("FAKE_FFMPEG_DELAY", "0")))
+    for k in range(sys.argv.count("-i") // 2):
+        with open(f"score{{k}}.json", "w") as f:
+            json.dump({{"pooled_metrics": {{"vmaf": {{"mean": 90.0}}}}}}, f)
+    sys.exit({returncode})
+    """
+)
+
+
+class FakeVMAFTestCase(unittest.TestCase):
+    """在临时目录中生成假 ffmpeg，构造使用它的 VMAFAnalyzer。"""
+
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.pairs = [(self.tmp / f"ref{k}.mp4", self.tmp / f"main{k}.mp4") for k in range(2)]
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _analyzer(self, returncode: int) -> VMAFAnalyzer:
+        ffmpeg = self.tmp / f"ffmpeg{returncode}"
+        ffmpeg.write_text(FAKE_FFMPEG.format(python=sys.executable, returncode=returncode))
+        ffmpeg.chmod(0o755)
+        return VMAFAnalyzer(ffmpeg_bin=str(ffmpeg), n_threads=2)
+
+
+class BatchReturnCodeTest(FakeVMAFTestCase):
+    """批量 VMAF 的 ffmpeg 中途失败时，已写出的截断日志不能当作分数。"""
+
+    def test_success_reads_scores(self) -> None:
+        analyzer = self._analyzer(0)
+        self.assertEqual(analyzer.calculate_vmaf_batch(self.pairs, "m"), [90.0, 90.0])
+        self.assertEqual(asyncio.run(analyzer._acalculate_vmaf_batch(self.pairs, "m")), [90.0, 90.0])
+
+    def test_failure_discards_partial_scores(self) -> None:
+        analyzer = self._analyzer(1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(analyzer.calculate_vmaf_batch(self.pairs, "m"), [None, None])
+            self.assertEqual(asyncio.run(analyzer._acalculate_vmaf_batch(self.pairs, "m")), [None, None])
+
+
+class AsyncVMAFRegistrationTest(FakeVMAFTestCase):
+    """异步 VMAF 子进程运行期间须登记到 src.utils.process，结束（含取消）后注销。"""
+
+    def setUp(self) -> None:
+        super().setUp()
+        os.environ["FAKE_FFMPEG_DELAY"] = "30"
+
+    def tearDown(self) -> None:
+        os.environ.pop("FAKE_FFMPEG_DELAY", None)
+        super().tearDown()
+
+    def _assert_registered_while_running(self, coro_factory) -> None:
+        async def _run() -> None:
+            task = asyncio.ensure_future(coro_factory())
+            await asyncio.sleep(0.3)
+            with process._live_lock:
+                self.assertEqual(len(process._live_procs), 1)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(_run())
+        with process._live_lock:
+            self.assertFalse(process._live_procs)
+
+    def test_single(self) -> None:
+        analyzer = self._analyzer(0)
+        ref, main = self.pairs[0]
+        self._assert_registered_while_running(lambda: analyzer._acalculate_vmaf(ref, main, "m"))
+
+    def test_batch(self) -> None:
+        analyzer = self._analyzer(0)
+        self._assert_registered_while_running(lambda: analyzer._acalculate_vmaf_batch(self.pairs, "m"))
+
+
+if __name__ == "__main__":
+    unittest.main()